@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+OPENERS = [
+    "Die Polizei bittet um Hinweise",
+    "Nach einem Vorfall in Berlin",
+    "Am Sonntagabend kam es",
+    "Ein Mann wurde verletzt",
+    "Zeugen werden gebeten",
+]
+SYLLABLES = ["ber", "lin", "stra", "ße", "pol", "zei", "kreu", "berg", "wag", "en", "hof", "dorf", "land", "ung"]
+
+
+def make_vocabulary(rng: random.Random, size: int = 20_000) -> list[str]:
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) + str(i) for i in range(size)]
+
+
+def make_sentence(rng: random.Random, vocabulary: list[str]) -> str:
+    words = [rng.choice(vocabulary) for _ in range(rng.randint(8, 16))]
+    return f"{rng.choice(OPENERS)} {' '.join(words)}."
+
+
+def main(size: int = 1_000_000, queries: int = 500) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "bench.sqlite")
+        os.environ["USE_LLM"] = "0"
+        import main as app_main
+
+        app_main.init_db()
+        rng = random.Random(7)
+        vocabulary = make_vocabulary(rng)
+        corpus: list[str] = []
+        started = time.perf_counter()
+        with app_main.get_db() as conn:
+            batch_sentences = []
+            batch_signatures = []
+            batch_bands = []
+            for i in range(size):
+                text = make_sentence(rng, vocabulary)
+                sentence_id = f"s{i}"
+                signature = app_main.minhash_signature(text)
+                batch_sentences.append((sentence_id, text, "-", "[]", "bench", "2026-01-01T00:00:00+00:00"))
+                batch_signatures.append((sentence_id, signature.tobytes()))
+                batch_bands.extend(
+                    (band, bucket, sentence_id)
+                    for band, bucket in enumerate(app_main.minhash_buckets(signature))
+                )
+                if len(corpus) < queries:
+                    corpus.append(text)
+                if len(batch_sentences) >= 10_000 or i == size - 1:
+                    conn.executemany(
+                        """
+                        INSERT OR IGNORE INTO sentences (id, text_de, text_ja, tags_json, source_handle, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        """,
+                        batch_sentences,
+                    )
+                    conn.executemany("INSERT INTO sentence_minhash VALUES (?, ?)", batch_signatures)
+                    conn.executemany("INSERT OR IGNORE INTO minhash_bands VALUES (?, ?, ?)", batch_bands)
+                    conn.commit()
+                    batch_sentences, batch_signatures, batch_bands = [], [], []
+                    print(f"\rindexed {i + 1}/{size}", end="", file=sys.stderr)
+        print(file=sys.stderr)
+        build_seconds = time.perf_counter() - started
+
+        probes = [text.rstrip(".") + " gestern." for text in corpus]
+        probes += [make_sentence(rng, vocabulary) for _ in range(queries)]
+        timings = []
+        hits = 0
+        with app_main.get_db() as conn:
+            for text in probes:
+                t0 = time.perf_counter()
+                if app_main.match_existing_sentence(conn, text, "bench"):
+                    hits += 1
+                timings.append(time.perf_counter() - t0)
+            conn.rollback()
+        signature_times = []
+        for text in probes[:200]:
+            t0 = time.perf_counter()
+            app_main.minhash_signature(text)
+            signature_times.append(time.perf_counter() - t0)
+
+    timings.sort()
+    print(f"corpus: {size} sentences, index build {build_seconds:.1f} s")
+    print(
+        f"lookup per item: mean {statistics.mean(timings) * 1e3:.2f} ms, "
+        f"p50 {timings[len(timings) // 2] * 1e3:.2f} ms, p95 {timings[int(len(timings) * 0.95)] * 1e3:.2f} ms"
+    )
+    print(f"signature only: mean {statistics.mean(signature_times) * 1e3:.2f} ms")
+    print(f"near-duplicate hits: {hits}/{len(probes)} ({queries} edited copies, {queries} fresh items)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+OPENERS = [
+    "Die Polizei bittet um Hinweise zu einem Vorfall",
+    "Nach einem Verkehrsunfall sucht die Feuerwehr",
+    "Am Sonntagabend kam es zu einer Sperrung",
+    "Ein Mann wurde bei einem Brand verletzt",
+    "Zeugen werden gebeten, sich zu melden",
+]
+PLACES = ["Mitte", "Neukölln", "Spandau", "Pankow", "Kreuzberg", "Wedding", "Lichtenberg", "Tempelhof"]
+
+
+def make_feed(rng: random.Random, index: int, items: int = 5) -> bytes:
+    entries = []
+    for item in range(items):
+        title = f"{rng.choice(OPENERS)} in {rng.choice(PLACES)} ({index}-{item})"
+        summary = f"<p>Der Einsatz dauerte {rng.randint(1, 9)} Stunden. Weitere Details folgen.</p>"
+        entries.append(f"<item><title>{title}</title><description><![CDATA[{summary}]]></description></item>")
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>bench</title>'
+        + "".join(entries)
+        + "</channel></rss>"
+    ).encode("utf-8")
+
+
+def main(feeds: int = 200, source_db: str | None = None) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "bench.sqlite")
+        if source_db is None:
+            os.environ["FEED_ARCHIVE_DIR"] = os.path.join(tmp, "feed_archive")
+        import main as app_main
+
+        app_main.init_db()
+        if source_db:
+            with app_main.get_db() as conn:
+                conn.execute("ATTACH DATABASE ? AS source", (source_db,))
+                conn.execute("INSERT OR IGNORE INTO feed_archive SELECT * FROM source.feed_archive")
+                conn.commit()
+        else:
+            rng = random.Random(11)
+            for index in range(feeds):
+                app_main.archive_feed_body(f"https://bench.invalid/{index % 10}.xml", "bench", make_feed(rng, index))
+
+        for label in ("cold", "warm"):
+            started = time.perf_counter()
+            result = app_main.replay_feed_archive()
+            wall = time.perf_counter() - started
+            print(
+                f"{label}: {result['bodies']} bodies, {result['posts']} posts, {result['stored']} stored "
+                f"in {wall:.2f} s ({result['postsPerSecond']} posts/s)"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, sys.argv[2] if len(sys.argv) > 2 else None)
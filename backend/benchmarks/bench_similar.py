@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_vectors(rng: np.random.Generator, topics: np.ndarray, count: int) -> np.ndarray:
+    noise = rng.standard_normal((count, topics.shape[1]), dtype=np.float32) / np.sqrt(topics.shape[1])
+    block = topics[rng.integers(0, len(topics), count)] + 0.6 * noise
+    return (block / np.linalg.norm(block, axis=1, keepdims=True)).astype(np.float32)
+
+
+def main(size: int = 500_000, dim: int = 768, queries: int = 200) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "bench.sqlite")
+        os.environ["EMBED_INDEX_PATH"] = os.path.join(tmp, "embeddings.f32")
+        import main as app_main
+
+        app_main.init_db()
+        index = app_main.embedding_index
+        rng = np.random.default_rng(5)
+        topics = rng.standard_normal((2_000, dim), dtype=np.float32) / np.sqrt(dim)
+        started = time.perf_counter()
+        for start in range(0, size, 10_000):
+            block = make_vectors(rng, topics, min(10_000, size - start))
+            index.append([(f"s{start + i}", row.tobytes()) for i, row in enumerate(block)])
+            print(f"\rindexed {start + len(block)}/{size}", end="", file=sys.stderr)
+        print(file=sys.stderr)
+        build_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index.vector_for("s0")
+        while index.training:
+            time.sleep(0.1)
+        train_seconds = time.perf_counter() - started
+
+        timings = []
+        recall = []
+        for i in range(queries):
+            sentence_id = f"s{i * 7919 % size}"
+            t0 = time.perf_counter()
+            vector = index.vector_for(sentence_id)
+            found = index.search(vector, 10, exclude=sentence_id)
+            timings.append(time.perf_counter() - t0)
+            if i < 50:
+                scores = index.matrix @ vector
+                scores[index.rows[sentence_id]] = -np.inf
+                exact = {index.sentence_ids[j] for j in np.argpartition(-scores, 9)[:10]}
+                recall.append(len(exact & {sid for sid, _ in found}) / 10)
+
+        t0 = time.perf_counter()
+        index.append([("new", make_vectors(rng, topics, 1)[0].tobytes())])
+        index.vector_for("new")
+        append_ms = (time.perf_counter() - t0) * 1e3
+
+    timings.sort()
+    print(f"index: {size} x {dim} float32, append {build_seconds:.1f} s, clustering {train_seconds:.1f} s")
+    print(
+        f"top-10 query: mean {statistics.mean(timings) * 1e3:.2f} ms, "
+        f"p50 {timings[len(timings) // 2] * 1e3:.2f} ms, p95 {timings[int(len(timings) * 0.95)] * 1e3:.2f} ms, "
+        f"recall@10 {statistics.mean(recall):.2f}"
+    )
+    print(f"append one item and refresh: {append_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+main.init_db()
+t2 = time.perf_counter()
+print(f"{t1 - t0:.6f} {t2 - t1:.6f}")
+"""
+
+
+def run_once(db_path: str) -> tuple[float, float]:
+    env = dict(os.environ, DB_PATH=db_path, USE_LLM="0")
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    return float(out[0]), float(out[1])
+
+
+def main(runs: int = 10) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.sqlite")
+        cold_import, first_init = run_once(db_path)
+        warm = [run_once(db_path) for _ in range(runs)]
+    imports = [w[0] for w in warm]
+    inits = [w[1] for w in warm]
+    print(f"first start: import {cold_import * 1000:.1f} ms, migrate+seed {first_init * 1000:.1f} ms")
+    print(f"import main: median {statistics.median(imports) * 1000:.1f} ms over {runs} runs")
+    print(f"init_db (migrated): median {statistics.median(inits) * 1000:.2f} ms over {runs} runs")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STATUSES = ["new", "due", "learned"]
+
+
+def add_users(app_main, conn, start: int, stop: int, lexeme_ids: list[str], deck: int, rng: random.Random) -> None:
+    now = app_main.datetime.now(app_main.timezone.utc)
+    users = []
+    cards = []
+    for index in range(start, stop):
+        user_id = f"user-{index}"
+        users.append((user_id, user_id, app_main.hash_user_token(f"token-{index}"), app_main.iso(now)))
+        for lexeme_id in rng.sample(lexeme_ids, deck):
+            status = rng.choice(STATUSES)
+            due_at = None if status == "new" else app_main.iso(now + app_main.timedelta(days=rng.randint(-5, 30)))
+            cards.append((f"{user_id}-{lexeme_id}", lexeme_id, lexeme_id, "back", status, due_at, app_main.iso(now), user_id))
+    conn.executemany("INSERT INTO users (id, name, token_hash, created_at) VALUES (?, ?, ?, ?)", users)
+    conn.executemany(
+        """
+        INSERT INTO cards (id, lexeme_id, front, back, status, due_at, created_at, user_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        cards,
+    )
+
+
+def measure(client, users: int, path: str, requests: int, rng: random.Random) -> tuple[float, float]:
+    timings = []
+    for _ in range(requests):
+        headers = {"Authorization": f"Bearer token-{rng.randrange(users)}"}
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.text
+    timings.sort()
+    return statistics.mean(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main(max_users: int = 10000, deck: int = 50, requests: int = 300) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "bench.sqlite")
+        os.environ["USE_LLM"] = "0"
+        os.environ["ADMISSION_ENABLED"] = "0"
+        os.environ["RETENTION_INTERVAL_SECONDS"] = "0"
+        os.environ["NOTIFY_TICK_SECONDS"] = "0"
+        import main as app_main
+        from fastapi.testclient import TestClient
+
+        app_main.init_db()
+        rng = random.Random(5)
+        now = app_main.iso(app_main.datetime.now(app_main.timezone.utc))
+        lexeme_ids = [f"lex-{index}" for index in range(5000)]
+        with app_main.get_db() as conn:
+            conn.execute(
+                "INSERT INTO sentences (id, text_de, text_ja, tags_json, source_handle, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                ("bench-sentence", "Bench.", "ベンチ", "[]", "manual", now),
+            )
+            conn.executemany(
+                """
+                INSERT INTO lexemes (id, sentence_id, text_de, meaning_ja, gender, etymology, created_at)
+                VALUES (?, ?, ?, '', '', '', ?)
+                """,
+                [(lexeme_id, "bench-sentence", lexeme_id, now) for lexeme_id in lexeme_ids],
+            )
+            conn.commit()
+
+        client = TestClient(app_main.app)
+        populated = 0
+        checkpoints = [n for n in (1, 10, 100, 1000, 10000, 100000) if n <= max_users]
+        for users in checkpoints:
+            with app_main.get_db() as conn:
+                add_users(app_main, conn, populated, users, lexeme_ids, deck, rng)
+                app_main.rebuild_card_stats(conn)
+                conn.commit()
+                conn.execute("ANALYZE")
+            populated = users
+            results = []
+            for path in ("/cards", "/cards?status=due", "/cards/stats", "/review/session"):
+                mean, p95 = measure(client, users, path, requests, rng)
+                results.append(f"{path} {mean:.2f}/{p95:.2f} ms")
+            print(f"{users:>6} users ({users * deck} cards): " + ", ".join(results))
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:4]))
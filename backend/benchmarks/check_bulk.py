@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MAX_LINE_BYTES = 200
+LINES = [
+    json.dumps({"text": "Der Bus kommt heute später."}),
+    json.dumps({"text": "Die U-Bahn fährt am Wochenende nicht.", "source": "bvg"}),
+    json.dumps({"text": "Der Bus kommt heute später."}),
+    "{not json",
+    json.dumps({"source": "bvg"}),
+    json.dumps({"text": "   "}),
+    json.dumps({"text": "Sehr lang " * 40}),
+    "",
+    json.dumps({"text": "Die Tram hält am Hauptbahnhof.", "source": ""}),
+]
+EXPECTED = [
+    ("stored", None),
+    ("stored", None),
+    ("duplicate", None),
+    ("error", "invalid json"),
+    ("error", "text is required"),
+    ("error", "Text is empty"),
+    ("error", "line too long"),
+    ("stored", None),
+]
+
+
+def chunked(body: bytes, size: int):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "check.sqlite")
+        os.environ["BULK_INGEST_BATCH_SIZE"] = "2"
+        os.environ["BULK_INGEST_MAX_LINE_BYTES"] = str(MAX_LINE_BYTES)
+        os.environ["USE_LLM"] = "0"
+        os.environ["ADMISSION_ENABLED"] = "0"
+        os.environ["RETENTION_INTERVAL_SECONDS"] = "0"
+        os.environ["NOTIFY_TICK_SECONDS"] = "0"
+        os.environ["EMBEDDINGS_ENABLED"] = "0"
+        import main as app_main
+        from fastapi.testclient import TestClient
+
+        body = ("\n".join(LINES) + "\n").encode("utf-8")
+        with TestClient(app_main.app) as client:
+            response = client.post(
+                "/ingest/bulk",
+                content=chunked(body, 7),
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+            assert response.status_code == 200, response.text
+            results = [json.loads(line) for line in response.text.splitlines()]
+            summary = results.pop()["summary"]
+            assert [(r["status"], r.get("detail")) for r in results] == EXPECTED, results
+            assert [r["line"] for r in results] == list(range(1, len(EXPECTED) + 1)), results
+            assert results[2]["sentenceId"] == results[0]["sentenceId"], results
+            assert {k: summary[k] for k in ("lines", "stored", "duplicates", "errors")} == {
+                "lines": 8, "stored": 3, "duplicates": 1, "errors": 4,
+            }, summary
+
+            again = client.post("/ingest/bulk", content=LINES[0] + "\n" + LINES[1])
+            again_results = [json.loads(line) for line in again.text.splitlines()][:-1]
+            assert [r["status"] for r in again_results] == ["duplicate", "duplicate"], again_results
+            assert [r["sentenceId"] for r in again_results] == [results[0]["sentenceId"], results[1]["sentenceId"]]
+
+            stored_ids = [r["sentenceId"] for r in results if r["status"] == "stored"]
+            marks = ", ".join("?" for _ in stored_ids)
+            with app_main.get_db() as conn:
+                rows = {r["id"]: r for r in conn.execute(
+                    f"SELECT id, source_handle, level FROM sentences WHERE id IN ({marks})", stored_ids
+                )}
+                assert conn.execute("SELECT COUNT(*) FROM sentences").fetchone()[0] == len(stored_ids)
+                assert [rows[sentence_id]["source_handle"] for sentence_id in stored_ids] == ["manual", "bvg", "manual"]
+                assert all(rows[sentence_id]["level"] is not None for sentence_id in stored_ids), rows
+                hashed = conn.execute(f"SELECT COUNT(*) FROM sentence_minhash WHERE sentence_id IN ({marks})", stored_ids)
+                assert hashed.fetchone()[0] == len(stored_ids)
+                pending_or_done = {r[0] for r in conn.execute(
+                    "SELECT sentence_id FROM enrichment_jobs UNION SELECT sentence_id FROM lexemes"
+                )}
+                assert set(stored_ids) <= pending_or_done, pending_or_done
+    print("per-line results, batching across 7-byte chunks, dedup within and across requests")
+    print("stored rows are scored, MinHash-indexed and queued for enrichment")
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import os
+import random
+import sys
+import tempfile
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ADMIN_TOKEN = "check-admin"
+STATUSES = ["new", "due", "difficult", "learned"]
+LEXEMES = 12
+STEPS = 200
+
+
+def expected_stats(conn, user_id: str) -> dict:
+    today = datetime.now(timezone.utc).date()
+    rows = conn.execute("SELECT status, due_at FROM cards WHERE user_id = ?", (user_id,)).fetchall()
+    by_status = Counter(r["status"] for r in rows)
+    open_days = [
+        datetime.fromisoformat(r["due_at"]).astimezone(timezone.utc).date() if r["due_at"] else None
+        for r in rows
+        if r["status"] != "learned"
+    ]
+    upcoming = Counter(day for day in open_days if day is not None and day >= today)
+    return {
+        "total": len(rows),
+        "byStatus": dict(by_status),
+        "unscheduled": open_days.count(None),
+        "overdue": sum(1 for day in open_days if day is not None and day < today),
+        "forecast": [
+            {"date": (today + timedelta(days=offset)).isoformat(), "count": upcoming[today + timedelta(days=offset)]}
+            for offset in range(30)
+        ],
+    }
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "check.sqlite")
+        os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+        os.environ["USE_LLM"] = "0"
+        os.environ["ADMISSION_ENABLED"] = "0"
+        os.environ["RETENTION_INTERVAL_SECONDS"] = "0"
+        os.environ["NOTIFY_TICK_SECONDS"] = "0"
+        os.environ["EMBEDDINGS_ENABLED"] = "0"
+        import main as app_main
+        from fastapi.testclient import TestClient
+
+        rng = random.Random(35)
+        now = datetime.now(timezone.utc)
+        with TestClient(app_main.app) as client:
+            admin = {"X-Admin-Token": ADMIN_TOKEN}
+            headers = {}
+            user_ids = {}
+            for name in ("anna", "ben"):
+                created = client.post("/admin/users", json={"name": name}, headers=admin).json()
+                headers[name] = {"Authorization": f"Bearer {created['token']}"}
+                user_ids[name] = created["id"]
+            lexeme_ids = [f"check-lex-{i}" for i in range(LEXEMES)]
+            with app_main.get_db() as conn:
+                conn.execute(
+                    "INSERT INTO sentences (id, text_de, text_ja, tags_json, source_handle, created_at) VALUES ('check-sentence', 'Der Hund schläft.', '犬は寝ている。', '[]', 'manual', ?)",
+                    (app_main.iso(now),),
+                )
+                conn.executemany(
+                    "INSERT INTO lexemes (id, sentence_id, text_de, meaning_ja, gender, etymology, created_at) VALUES (?, 'check-sentence', ?, '', '', '', ?)",
+                    [(lexeme_id, f"Wort {i}", app_main.iso(now)) for i, lexeme_id in enumerate(lexeme_ids)],
+                )
+                conn.commit()
+
+            cards: dict[str, list[str]] = {"anna": [], "ben": []}
+            for name in ("anna", "ben"):
+                for lexeme_id in lexeme_ids[: LEXEMES // 2]:
+                    cards[name].append(client.post("/cards", json={"lexemeId": lexeme_id}, headers=headers[name]).json()["id"])
+            with app_main.get_db() as conn:
+                conn.executemany(
+                    "UPDATE cards SET due_at = ? WHERE id = ?",
+                    [
+                        (app_main.iso(now + timedelta(days=rng.randint(-5, 40), hours=rng.randint(0, 23))), card_id)
+                        for card_id in cards["anna"][::2] + cards["ben"][1::2]
+                    ],
+                )
+                conn.commit()
+            assert client.post("/admin/rebuild-card-stats", headers=admin).json()["consistent"] is False
+
+            for step in range(STEPS):
+                name = rng.choice(["anna", "ben"])
+                action = rng.random()
+                if action < 0.1:
+                    lexeme_id = rng.choice(lexeme_ids)
+                    card = client.post("/cards", json={"lexemeId": lexeme_id}, headers=headers[name]).json()
+                    if card["id"] not in cards[name]:
+                        cards[name].append(card["id"])
+                else:
+                    card_id = rng.choice(cards[name])
+                    rating = rng.choice(STATUSES)
+                    response = client.post(f"/cards/{card_id}/review", json={"rating": rating}, headers=headers[name])
+                    assert response.status_code == 200, response.text
+                if step % 20 == 0 or step == STEPS - 1:
+                    with app_main.get_db() as conn:
+                        for other in ("anna", "ben"):
+                            stats = client.get("/cards/stats", headers=headers[other]).json()
+                            assert stats == expected_stats(conn, user_ids[other]), (step, other, stats)
+
+            result = client.post("/admin/rebuild-card-stats", headers=admin).json()
+            with app_main.get_db() as conn:
+                total = conn.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+            assert result == {"consistent": True, "cards": total}, result
+            assert total >= sum(len(ids) for ids in cards.values()) > 2 * (LEXEMES // 2), cards
+    print(f"{STEPS} random creates and reviews over two users keep /cards/stats equal to the cards table")
+    print("rebuild-card-stats finds the incremental counters consistent")
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ORIGINAL = "Die Polizei sucht nach einem Unfall in Neukölln am Sonntagabend dringend Zeugen für den Vorfall."
+VARIANT = "Die Polizei sucht nach einem Unfall in Neukölln am Sonntagabend dringend Zeugen für den Vorfall!"
+EDITED = "Die Polizei sucht nach einem Unfall in Neukölln am Sonntagabend dringend Zeugen für den Brand."
+UNRELATED = "Der Wochenmarkt am Maybachufer öffnet dienstags und freitags."
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "check.sqlite")
+        os.environ["USE_LLM"] = "0"
+        os.environ["EMBEDDINGS_ENABLED"] = "0"
+        import main as app_main
+
+        app_main.init_db()
+        signature = app_main.minhash_signature(ORIGINAL)
+        assert app_main.minhash_similarity(signature, app_main.minhash_signature(VARIANT)) == 1.0
+        a, b = app_main.shingle_hashes(ORIGINAL), app_main.shingle_hashes(EDITED)
+        jaccard = len(a & b) / len(a | b)
+        estimate = app_main.minhash_similarity(signature, app_main.minhash_signature(EDITED))
+        assert abs(estimate - jaccard) <= 0.15, (estimate, jaccard)
+        assert app_main.minhash_similarity(signature, app_main.minhash_signature(UNRELATED)) < 0.2
+
+        original_id, inserted = app_main.store_sentence(ORIGINAL, "polizei")
+        assert inserted
+        assert app_main.store_sentence(VARIANT, "rbb") == (original_id, False)
+        assert app_main.store_sentence(EDITED, "rbb") == (original_id, False)
+        unrelated_id, inserted = app_main.store_sentence(UNRELATED, "rbb")
+        assert inserted and unrelated_id != original_id
+        with app_main.get_db() as conn:
+            rows = {r["text_de"]: r for r in conn.execute("SELECT text_de, sentence_id, similarity FROM near_duplicates")}
+            assert set(rows) == {VARIANT, EDITED}, rows
+            assert {r["sentence_id"] for r in rows.values()} == {original_id}
+            assert rows[VARIANT]["similarity"] == 1.0 and rows[EDITED]["similarity"] >= app_main.NEAR_DUP_THRESHOLD
+            assert conn.execute("SELECT COUNT(*) FROM sentences").fetchone()[0] == 2
+            assert conn.execute("SELECT COUNT(*) FROM minhash_bands").fetchone()[0] == 2 * app_main.NEAR_DUP_BANDS
+
+            conn.execute("DELETE FROM minhash_bands")
+            conn.execute("DELETE FROM sentence_minhash")
+            assert app_main.find_near_duplicate(conn, signature) is None
+            assert app_main.index_missing_minhashes(conn) == 2
+            assert app_main.find_near_duplicate(conn, signature) == (original_id, 1.0)
+            conn.commit()
+    print(f"estimate {estimate:.2f} for true Jaccard {jaccard:.2f} after a one-word edit")
+    print("variants are linked in near_duplicates and not stored; the index rebuilds from sentences")
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BASELINE_SCHEMA = [
+    """
+    CREATE TABLE sentences (
+        id TEXT PRIMARY KEY,
+        text_de TEXT NOT NULL,
+        text_ja TEXT NOT NULL,
+        tags_json TEXT NOT NULL,
+        source_handle TEXT NOT NULL,
+        created_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE lexemes (
+        id TEXT PRIMARY KEY,
+        sentence_id TEXT NOT NULL,
+        text_de TEXT NOT NULL,
+        meaning_ja TEXT NOT NULL,
+        gender TEXT NOT NULL,
+        etymology TEXT NOT NULL,
+        preposition_pattern TEXT,
+        verb_forms TEXT,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY(sentence_id) REFERENCES sentences(id)
+    )
+    """,
+    """
+    CREATE TABLE cards (
+        id TEXT PRIMARY KEY,
+        lexeme_id TEXT NOT NULL,
+        front TEXT NOT NULL,
+        back TEXT NOT NULL,
+        status TEXT NOT NULL,
+        due_at TEXT,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY(lexeme_id) REFERENCES lexemes(id)
+    )
+    """,
+    """
+    CREATE TABLE sources (
+        id TEXT PRIMARY KEY,
+        handle TEXT NOT NULL,
+        type TEXT NOT NULL,
+        rss_url TEXT,
+        enabled INTEGER NOT NULL,
+        last_sync_at TEXT,
+        created_at TEXT NOT NULL
+    )
+    """,
+]
+
+SENTENCES = [
+    ("s1", "Der Zug fährt um acht Uhr ab.", "電車は8時に出発する。"),
+    ("s2", "Vgl. z.B. die Regeln. Sie gelten ab heute.", "例えば規則を参照。今日から有効だ。"),
+    ("s3", "Die Bäckerei öffnet morgen früh.", "(未翻訳)"),
+    ("s4", "Wir treffen uns am Alexanderplatz.", "アレクサンダー広場で会おう。"),
+]
+CARDS = [
+    ("c1", "l1", "der Zug", "learned", "2026-01-10T08:00:00+00:00"),
+    ("c2", "l2", "die Bäckerei", "due", "2026-01-03T08:00:00+00:00"),
+    ("c3", "l3", "treffen", "new", None),
+]
+
+
+def build_baseline(path: str) -> None:
+    conn = sqlite3.connect(path)
+    for ddl in BASELINE_SCHEMA:
+        conn.execute(ddl)
+    created_at = "2026-01-01T00:00:00+00:00"
+    conn.executemany(
+        "INSERT INTO sentences (id, text_de, text_ja, tags_json, source_handle, created_at) VALUES (?, ?, ?, '[]', 'manual', ?)",
+        [(*row, created_at) for row in SENTENCES],
+    )
+    conn.executemany(
+        "INSERT INTO lexemes (id, sentence_id, text_de, meaning_ja, gender, etymology, created_at) VALUES (?, ?, ?, '', '', '', ?)",
+        [("l1", "s1", "der Zug", created_at), ("l2", "s3", "die Bäckerei", created_at), ("l3", "s4", "treffen", created_at)],
+    )
+    conn.executemany(
+        "INSERT INTO cards (id, lexeme_id, front, back, status, due_at, created_at) VALUES (?, ?, ?, 'back', ?, ?, ?)",
+        [(*row, created_at) for row in CARDS],
+    )
+    conn.execute(
+        "INSERT INTO sources (id, handle, type, rss_url, enabled, last_sync_at, created_at) VALUES ('src1', 'tagesschau', 'rss', 'https://example.invalid/rss', 1, NULL, ?)",
+        (created_at,),
+    )
+    conn.commit()
+    conn.close()
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "baseline.sqlite")
+        os.environ["USE_LLM"] = "0"
+        os.environ["ADMISSION_ENABLED"] = "0"
+        os.environ["RETENTION_INTERVAL_SECONDS"] = "0"
+        os.environ["NOTIFY_TICK_SECONDS"] = "0"
+        os.environ["EMBEDDINGS_ENABLED"] = "0"
+        build_baseline(os.environ["DB_PATH"])
+        import main as app_main
+
+        app_main.init_db()
+        app_main.init_db()
+        app_main.drain_score_dirty()
+        with app_main.get_db() as conn:
+            assert conn.execute("PRAGMA user_version").fetchone()[0] == app_main.SCHEMA_VERSION
+            assert conn.execute("SELECT COUNT(*) FROM sentences").fetchone()[0] == len(SENTENCES)
+            owners = {r[0] for r in conn.execute("SELECT user_id FROM cards")}
+            assert owners == {app_main.DEFAULT_USER_ID}, owners
+            counts = {r["status"]: r["count"] for r in conn.execute(
+                "SELECT status, count FROM card_status_counts WHERE user_id = ? AND count != 0",
+                (app_main.DEFAULT_USER_ID,),
+            )}
+            assert counts == {"learned": 1, "due": 1, "new": 1}, counts
+            memory = {r[0] for r in conn.execute("SELECT source_de FROM translation_memory")}
+            assert memory == {SENTENCES[0][1], SENTENCES[3][1]}, memory
+            assert conn.execute("SELECT COUNT(*) FROM sentence_minhash").fetchone()[0] == len(SENTENCES)
+            assert conn.execute("SELECT COUNT(*) FROM sentences WHERE level IS NULL").fetchone()[0] == 0
+            logged = conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+            assert logged == len(SENTENCES) + 3 + len(CARDS), logged
+    print(f"baseline upgraded to schema {app_main.SCHEMA_VERSION}")
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
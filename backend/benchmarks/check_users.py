@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ADMIN_TOKEN = "check-admin"
+ADMIN_ROUTES = [
+    ("POST", "/admin/notifications/plan"),
+    ("POST", "/admin/snapshot"),
+    ("GET", "/admin/retention/policies"),
+    ("PUT", "/admin/retention/policies/manual"),
+    ("POST", "/admin/retention/run?dryRun=true"),
+    ("POST", "/admin/rescore?limit=1"),
+    ("POST", "/admin/rebuild-card-stats"),
+    ("POST", "/admin/replay-feeds"),
+    ("POST", "/admin/prune-feed-archive"),
+    ("POST", "/admin/rebuild-near-dup-index"),
+    ("POST", "/admin/backfill-embeddings?limit=1"),
+]
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DB_PATH"] = os.path.join(tmp, "check.sqlite")
+        os.environ["SNAPSHOT_DIR"] = os.path.join(tmp, "snapshots")
+        os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+        os.environ["USE_LLM"] = "0"
+        os.environ["ADMISSION_ENABLED"] = "0"
+        os.environ["RETENTION_INTERVAL_SECONDS"] = "0"
+        os.environ["NOTIFY_TICK_SECONDS"] = "0"
+        os.environ["EMBEDDINGS_ENABLED"] = "0"
+        import main as app_main
+        from fastapi.testclient import TestClient
+
+        with TestClient(app_main.app) as client:
+            headers = {}
+            for name in ("anna", "ben"):
+                response = client.post("/admin/users", json={"name": name}, headers={"X-Admin-Token": ADMIN_TOKEN})
+                assert response.status_code == 200, response.text
+                headers[name] = {"Authorization": f"Bearer {response.json()['token']}"}
+            assert client.post("/admin/users", json={"name": "eve"}).status_code == 403
+            for method, path in ADMIN_ROUTES:
+                response = client.request(method, path, json={"maxAgeDays": None, "maxSentences": None})
+                assert response.status_code == 403, (method, path, response.status_code)
+            response = client.post("/admin/rescore?limit=1", headers={"X-Admin-Token": ADMIN_TOKEN})
+            assert response.status_code == 200, response.text
+
+            lexeme_ids = ["check-lex-1", "check-lex-2", "check-lex-3"]
+            created_at = app_main.iso(app_main.datetime.now(app_main.timezone.utc))
+            with app_main.get_db() as conn:
+                conn.execute(
+                    "INSERT INTO sentences (id, text_de, text_ja, tags_json, source_handle, created_at) VALUES (?, ?, ?, '[]', 'manual', ?)",
+                    ("check-sentence", "Der Hund sieht die Katze.", "犬は猫を見る。", created_at),
+                )
+                conn.executemany(
+                    "INSERT INTO lexemes (id, sentence_id, text_de, meaning_ja, gender, etymology, created_at) VALUES (?, 'check-sentence', ?, '', '', '', ?)",
+                    [(lexeme_id, text, created_at) for lexeme_id, text in zip(lexeme_ids, ("der Hund", "sehen", "die Katze"))],
+                )
+                conn.commit()
+            anna_card = client.post("/cards", json={"lexemeId": lexeme_ids[0]}, headers=headers["anna"]).json()
+            ben_cards = [
+                client.post("/cards", json={"lexemeId": lexeme_id}, headers=headers["ben"]).json()
+                for lexeme_id in lexeme_ids[1:]
+            ]
+            with app_main.get_db() as conn:
+                conn.execute("DELETE FROM cards WHERE id = ?", (ben_cards[1]["id"],))
+                conn.commit()
+            ben_ids = {card["id"] for card in ben_cards}
+
+            cards = client.get("/cards", headers=headers["anna"]).json()
+            assert [card["id"] for card in cards] == [anna_card["id"]], cards
+            stats = client.get("/cards/stats", headers=headers["anna"]).json()
+            assert stats["total"] == 1, stats
+            session = client.get("/review/session", headers=headers["anna"]).json()
+            assert not ben_ids & {item["card"]["id"] for item in session["items"]}, session
+            review = client.post(f"/cards/{ben_cards[0]['id']}/review", json={"rating": "learned"}, headers=headers["anna"])
+            assert review.status_code == 404, review.text
+            review = client.post(f"/cards/{anna_card['id']}/review", json={"rating": "know"}, headers=headers["anna"])
+            assert review.status_code == 422, review.text
+            assert client.get("/reviews", headers=headers["anna"]).json() == []
+
+            seen_cards: set[str] = set()
+            seen_deleted: set[str] = set()
+            since = 0
+            while True:
+                page = client.get(f"/sync/changes?since={since}&limit=2", headers=headers["anna"]).json()
+                seen_cards |= {card["id"] for card in page["cards"]}
+                seen_deleted |= {item["id"] for item in page["deleted"] if item["entity"] == "card"}
+                since = page["version"]
+                if not page["hasMore"]:
+                    break
+            assert anna_card["id"] in seen_cards, seen_cards
+            assert not ben_ids & (seen_cards | seen_deleted), (seen_cards, seen_deleted)
+
+            snapshot_cards = client.get("/snapshot/cards", headers=headers["anna"]).json()
+            assert [card["id"] for card in snapshot_cards["cards"]] == [anna_card["id"]], snapshot_cards
+            assert snapshot_cards["cards"][0]["lexemeId"] == lexeme_ids[0]
+            assert client.get(f"/sync/changes?since={snapshot_cards['version']}", headers=headers["anna"]).json()["cards"] == []
+
+            ben_sync = client.get("/sync/changes?since=0&limit=5000", headers=headers["ben"]).json()
+            assert {item["id"] for item in ben_sync["deleted"]} == {ben_cards[1]["id"]}, ben_sync["deleted"]
+            assert anna_card["id"] not in {card["id"] for card in ben_sync["cards"]}
+            assert client.get("/cards", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    print("admin routes require X-Admin-Token")
+    print("review ratings outside the card statuses return 422")
+    print("cards, stats, review session, reviews, /snapshot/cards and /sync/changes are isolated per user")
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
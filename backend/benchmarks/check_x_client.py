@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUN_SNIPPET = """
+import sys
+from fastapi.testclient import TestClient
+import main
+
+with TestClient(main.app) as client:
+    stored = 0
+    if sys.argv[1] == "1":
+        with main.get_db() as conn:
+            conn.execute(
+                "INSERT INTO sources (id, handle, type, rss_url, enabled, last_sync_at, created_at) "
+                "VALUES ('x-berlin', 'berlinnews', 'x', NULL, 1, NULL, ?)",
+                (main.iso(main.datetime.now(main.timezone.utc)),),
+            )
+            conn.commit()
+    for _ in range(int(sys.argv[2])):
+        response = client.post("/ingest/auto")
+        assert response.status_code == 200, response.text
+        assert not response.json()["errors"], response.json()
+        stored += response.json()["stored"]
+    print(f"phase {sys.argv[1]}: stored {stored}")
+"""
+
+
+class XStub:
+    def __init__(self) -> None:
+        self.calls: list[dict] = []
+        self.tweet_calls = 0
+        self.lock = threading.Lock()
+
+    def tweets_response(self) -> tuple[int, dict, dict]:
+        self.tweet_calls += 1
+        reset = int(time.time()) + 2
+        if self.tweet_calls == 1:
+            body = {"data": [{"id": "101", "text": "Die Ringbahn fährt wieder."}], "meta": {"newest_id": "101"}}
+            return 200, body, {"x-rate-limit-remaining": "0", "x-rate-limit-reset": str(reset)}
+        if self.tweet_calls == 2:
+            return 429, {"title": "Too Many Requests"}, {"x-rate-limit-remaining": "0", "x-rate-limit-reset": str(reset)}
+        if self.tweet_calls == 3:
+            body = {
+                "data": [{"id": "103", "text": "Morgen wird es sonnig."}],
+                "meta": {"newest_id": "103", "next_token": "page-2"},
+            }
+            return 200, body, {"x-rate-limit-remaining": "5", "x-rate-limit-reset": str(reset)}
+        if self.tweet_calls == 4:
+            body = {"data": [{"id": "102", "text": "Der Markt schließt um sechs."}], "meta": {"newest_id": "102"}}
+            return 200, body, {"x-rate-limit-remaining": "4", "x-rate-limit-reset": str(reset)}
+        return 200, {"meta": {"result_count": 0}}, {"x-rate-limit-remaining": "5", "x-rate-limit-reset": str(reset)}
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                with stub.lock:
+                    call = {"path": url.path, "query": parse_qs(url.query), "at": time.time()}
+                    if url.path == "/users/by/username/berlinnews":
+                        status, body, headers = 200, {"data": {"id": "42"}}, {}
+                    elif url.path == "/users/42/tweets":
+                        status, body, headers = stub.tweets_response()
+                    else:
+                        status, body, headers = 404, {}, {}
+                    call["status"] = status
+                    call["reset"] = float(headers.get("x-rate-limit-reset", 0))
+                    stub.calls.append(call)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+
+def run_process(env: dict, phase: int, rounds: int) -> None:
+    subprocess.run(
+        [sys.executable, "-c", RUN_SNIPPET, str(phase), str(rounds)],
+        cwd=BACKEND_DIR,
+        env=env,
+        check=True,
+    )
+
+
+def main() -> None:
+    stub = XStub()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), stub.handler())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                DB_PATH=os.path.join(tmp, "check.sqlite"),
+                X_BASE_URL=f"http://127.0.0.1:{server.server_address[1]}",
+                X_BEARER_TOKEN="stub-token",
+                USE_LLM="0",
+                ADMISSION_ENABLED="0",
+                RETENTION_INTERVAL_SECONDS="0",
+                NOTIFY_TICK_SECONDS="0",
+                EMBEDDINGS_ENABLED="0",
+            )
+            run_process(env, 1, 2)
+            run_process(env, 2, 1)
+    finally:
+        server.shutdown()
+
+    lookups = [c for c in stub.calls if c["path"].startswith("/users/by/username/")]
+    tweets = [c for c in stub.calls if c["path"] == "/users/42/tweets"]
+    assert len(lookups) == 1, f"expected one user lookup across restarts, got {len(lookups)}"
+    assert [c["status"] for c in tweets] == [200, 429, 200, 200, 200], [c["status"] for c in tweets]
+
+    first, limited, retried, second_page, restarted = tweets
+    assert "since_id" not in first["query"], first["query"]
+    assert limited["at"] >= first["reset"] - 0.05, "request sent before x-rate-limit-reset"
+    print(f"remaining=0: waited {limited['at'] - first['at']:.2f}s for the reset")
+    assert retried["at"] >= limited["reset"] - 0.05, "429 retried before x-rate-limit-reset"
+    assert retried["query"].get("since_id") == ["101"], retried["query"]
+    print(f"429: retried after {retried['at'] - limited['at']:.2f}s with since_id=101")
+    assert second_page["query"].get("pagination_token") == ["page-2"], second_page["query"]
+    assert second_page["query"].get("since_id") == ["101"], second_page["query"]
+    print("next_token: second page fetched with pagination_token before since_id advanced")
+    assert restarted["query"].get("since_id") == ["103"], restarted["query"]
+    assert "pagination_token" not in restarted["query"], restarted["query"]
+    print("restart: since_id=103 loaded from x_sync_state, user id from x_user_ids")
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
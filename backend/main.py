@@ -1,20 +1,83 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import asyncio
+import concurrent.futures
+import cProfile
+import gzip
+from array import array
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+import contextvars
+import functools
+from datetime import datetime, timedelta, timezone
+import hashlib
+import hmac
+import logging
 import os
+import pstats
+import random
+import secrets
 import re
 import json
+import math
+import shutil
 import sqlite3
-from typing import List, Optional
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Iterator, List, Literal, Optional
 from uuid import uuid4
+from zoneinfo import ZoneInfo
 
-import httpx
-import feedparser
-from fastapi import FastAPI, HTTPException
+from anyio import CapacityLimiter, from_thread, to_thread
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
-app = FastAPI(title="BerlinCoach API", version="0.1.0")
+if TYPE_CHECKING:
+    import httpx
+    import numpy as np
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    shared_http.attach(asyncio.get_running_loop())
+    await db_executor.run("write", init_db)
+    if await db_executor.run("read", count_enrichment_jobs):
+        ensure_enrichment_worker()
+    schedule_rescore()
+    if RETENTION_INTERVAL_SECONDS > 0:
+        ensure_retention_worker()
+    if NOTIFY_TICK_SECONDS > 0:
+        ensure_notification_worker()
+    yield
+    await x_client.aclose()
+    await shared_http.aclose()
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not ADMISSION_ENABLED or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        pool, rejection = admission_controller.admit(scope)
+        if rejection is not None:
+            await rejection(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission_controller.release(pool)
+
+
+app = FastAPI(title="BerlinCoach API", version="0.1.0", lifespan=lifespan)
+
+app.add_middleware(AdmissionControlMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,11 +89,102 @@ app.add_middleware(
 
 X_BASE_URL = os.getenv("X_BASE_URL", "https://api.x.com/2")
 X_BEARER_TOKEN = os.getenv("X_BEARER_TOKEN")
+X_MAX_RESULTS = int(os.getenv("X_MAX_RESULTS", "5"))
+X_RATE_LIMIT_MAX_WAIT = float(os.getenv("X_RATE_LIMIT_MAX_WAIT", "60"))
 DEBUG_RSS = os.getenv("DEBUG_RSS", "0") == "1"
 DB_PATH = os.getenv("DB_PATH", os.path.join(os.path.dirname(__file__), "berlincoach.sqlite"))
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1")
 USE_LLM = os.getenv("USE_LLM", "1") == "1"
+BULK_INGEST_BATCH_SIZE = int(os.getenv("BULK_INGEST_BATCH_SIZE", "200"))
+BULK_INGEST_MAX_LINE_BYTES = int(os.getenv("BULK_INGEST_MAX_LINE_BYTES", "65536"))
+ENRICH_WORKER_BATCH = int(os.getenv("ENRICH_WORKER_BATCH", "10"))
+SETTINGS_POLL_SECONDS = float(os.getenv("SETTINGS_POLL_SECONDS", "1"))
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "1") == "1"
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.7"))
+NEAR_DUP_PERMUTATIONS = int(os.getenv("NEAR_DUP_PERMUTATIONS", "64"))
+NEAR_DUP_BANDS = int(os.getenv("NEAR_DUP_BANDS", "16"))
+NEAR_DUP_MAX_CANDIDATES = int(os.getenv("NEAR_DUP_MAX_CANDIDATES", "500"))
+TM_ENABLED = os.getenv("TM_ENABLED", "1") == "1"
+TM_FUZZY_THRESHOLD = float(os.getenv("TM_FUZZY_THRESHOLD", "0.5"))
+TM_MAX_POSTINGS = int(os.getenv("TM_MAX_POSTINGS", "200"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+LLM_INTERACTIVE_RESERVED = int(os.getenv("LLM_INTERACTIVE_RESERVED", "1"))
+GERMAN_LEXICON_DIR = os.getenv("GERMAN_LEXICON_DIR", os.path.join(os.path.dirname(__file__), "data"))
+LEXEME_MAX_CANDIDATES = int(os.getenv("LEXEME_MAX_CANDIDATES", "5"))
+SCORE_RESCORE_BATCH = int(os.getenv("SCORE_RESCORE_BATCH", "500"))
+SCORE_CANDIDATES = int(os.getenv("SCORE_CANDIDATES", "200"))
+EMBEDDINGS_ENABLED = os.getenv("EMBEDDINGS_ENABLED", "1") == "1"
+OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+EMBED_DIM = int(os.getenv("EMBED_DIM", "0"))
+EMBED_INDEX_PATH = os.getenv(
+    "EMBED_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "embeddings.f32")
+)
+EMBED_IVF_MIN_ROWS = int(os.getenv("EMBED_IVF_MIN_ROWS", "50000"))
+EMBED_IVF_NPROBE = int(os.getenv("EMBED_IVF_NPROBE", "8"))
+EMBED_IVF_TAIL_MAX = int(os.getenv("EMBED_IVF_TAIL_MAX", "5000"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_MAX_SECONDS = int(os.getenv("PROFILE_MAX_SECONDS", "300"))
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "40"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_EXPENSIVE_CONCURRENCY = int(os.getenv("ADMISSION_EXPENSIVE_CONCURRENCY", "4"))
+ADMISSION_CHEAP_CONCURRENCY = int(os.getenv("ADMISSION_CHEAP_CONCURRENCY", "32"))
+ADMISSION_EXPENSIVE_RATE = float(os.getenv("ADMISSION_EXPENSIVE_RATE", "10"))
+ADMISSION_EXPENSIVE_BURST = float(os.getenv("ADMISSION_EXPENSIVE_BURST", "3"))
+ADMISSION_CHEAP_RATE = float(os.getenv("ADMISSION_CHEAP_RATE", "20"))
+ADMISSION_CHEAP_BURST = float(os.getenv("ADMISSION_CHEAP_BURST", "40"))
+ADMISSION_INGEST_CONCURRENCY = int(os.getenv("ADMISSION_INGEST_CONCURRENCY", "8"))
+ADMISSION_INGEST_RATE = float(os.getenv("ADMISSION_INGEST_RATE", "60"))
+ADMISSION_INGEST_BURST = float(os.getenv("ADMISSION_INGEST_BURST", "20"))
+ADMISSION_MAX_CLIENTS = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+ADMISSION_RETRY_AFTER = {
+    "cheap": 1,
+    "ingest": 2,
+    "expensive": int(os.getenv("ADMISSION_EXPENSIVE_RETRY_AFTER", "10")),
+}
+ADMISSION_TRUST_PROXY = os.getenv("ADMISSION_TRUST_PROXY", "0") == "1"
+INGEST_ROUTES = {("POST", "/ingest")}
+EXPENSIVE_ROUTES = [
+    ("POST", "/ingest/"),
+    ("POST", "/sources/preview"),
+    ("POST", "/admin/backfill-"),
+    ("POST", "/admin/rebuild-near-dup-index"),
+    ("POST", "/admin/rescore"),
+    ("POST", "/admin/retention/run"),
+    ("POST", "/admin/replay-feeds"),
+    ("POST", "/admin/prune-feed-archive"),
+    ("POST", "/admin/snapshot"),
+]
+FEED_ARCHIVE_ENABLED = os.getenv("FEED_ARCHIVE_ENABLED", "1") == "1"
+FEED_ARCHIVE_DIR = os.getenv(
+    "FEED_ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "feed_archive")
+)
+FEED_ARCHIVE_MAX_BYTES = int(os.getenv("FEED_ARCHIVE_MAX_BYTES", str(200 * 1024 * 1024)))
+FEED_ARCHIVE_MAX_AGE_DAYS = int(os.getenv("FEED_ARCHIVE_MAX_AGE_DAYS", "90"))
+SNAPSHOT_DIR = os.getenv(
+    "SNAPSHOT_DIR", os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "snapshots")
+)
+SNAPSHOT_REFRESH_SECONDS = int(os.getenv("SNAPSHOT_REFRESH_SECONDS", "3600"))
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "2"))
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+ARCHIVE_DB_PATH = os.getenv(
+    "ARCHIVE_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(DB_PATH)), "berlincoach-archive.sqlite")
+)
+RETENTION_MAX_AGE_DAYS = int(os.getenv("RETENTION_MAX_AGE_DAYS", "365"))
+RETENTION_MAX_SENTENCES = int(os.getenv("RETENTION_MAX_SENTENCES", "10000"))
+RETENTION_ORPHAN_MAX_AGE_DAYS = int(os.getenv("RETENTION_ORPHAN_MAX_AGE_DAYS", "0"))
+RETENTION_INTERVAL_SECONDS = int(os.getenv("RETENTION_INTERVAL_SECONDS", "0"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "500"))
+RETENTION_VACUUM_PAGES = int(os.getenv("RETENTION_VACUUM_PAGES", "2000"))
+NOTIFY_TIMEZONE = os.getenv("NOTIFY_TIMEZONE", "Europe/Berlin")
+NOTIFY_HORIZON_HOURS = int(os.getenv("NOTIFY_HORIZON_HOURS", "24"))
+NOTIFY_TICK_SECONDS = int(os.getenv("NOTIFY_TICK_SECONDS", "60"))
+DEFAULT_USER_ID = "default"
+SINGLE_USER = os.getenv("SINGLE_USER", "1") == "1"
+DB_READERS = int(os.getenv("DB_READERS", "16"))
+DB_JOB_WORKERS = int(os.getenv("DB_JOB_WORKERS", "4"))
 
 # ------------------------
 # Data Models
@@ -75,6 +229,84 @@ class CardDTO(BaseModel):
     dueAt: Optional[str] = None
 
 
+class UserDTO(BaseModel):
+    id: str
+    name: str
+    createdAt: str
+
+
+class CreatedUserDTO(UserDTO):
+    token: str
+
+
+class ReviewLogDTO(BaseModel):
+    cardId: str
+    rating: str
+    previousStatus: str
+    reviewedAt: str
+
+
+class DueDayDTO(BaseModel):
+    date: str
+    count: int
+
+
+class CardStatsDTO(BaseModel):
+    total: int
+    byStatus: dict[str, int]
+    unscheduled: int
+    overdue: int
+    forecast: List[DueDayDTO]
+
+
+class RetentionPolicyDTO(BaseModel):
+    sourceHandle: str
+    maxAgeDays: Optional[int] = None
+    maxSentences: Optional[int] = None
+
+
+class SimilarSentenceDTO(SentenceDTO):
+    score: float
+
+
+class SyncLexemeDTO(LexemeDTO):
+    sentenceId: str
+
+
+class SyncCardDTO(CardDTO):
+    lexemeId: str
+
+
+class SnapshotCardsDTO(BaseModel):
+    version: int
+    cards: List[SyncCardDTO]
+
+
+class SyncDeletedDTO(BaseModel):
+    entity: str
+    id: str
+
+
+class SyncChangesDTO(BaseModel):
+    version: int
+    hasMore: bool
+    sentences: List[SentenceDTO]
+    lexemes: List[SyncLexemeDTO]
+    cards: List[SyncCardDTO]
+    deleted: List[SyncDeletedDTO]
+
+
+class ReviewItemDTO(BaseModel):
+    card: CardDTO
+    lexeme: Optional[LexemeDTO] = None
+    sentence: Optional[SentenceDTO] = None
+
+
+class ReviewSessionDTO(BaseModel):
+    generatedAt: str
+    items: List[ReviewItemDTO]
+
+
 class NotificationScheduleDTO(BaseModel):
     active: bool
     startHour: int
@@ -85,6 +317,12 @@ class NotificationScheduleDTO(BaseModel):
     intervalMinutes: int = 60
 
 
+class NotificationSlotDTO(BaseModel):
+    slotAt: str
+    status: str
+    sentences: List[SentenceDTO]
+
+
 class UpdateSourceRequest(BaseModel):
     enabled: Optional[bool] = None
     handle: Optional[str] = None
@@ -107,8 +345,15 @@ class SourcePreviewDTO(BaseModel):
     items: List[str] = Field(default_factory=list)
 
 
+class CreateUserRequest(BaseModel):
+    name: str
+
+
+CardStatus = Literal["new", "due", "difficult", "learned"]
+
+
 class ReviewCardRequest(BaseModel):
-    rating: str
+    rating: CardStatus
 
 
 class IngestRequest(BaseModel):
@@ -223,7 +468,7 @@ cards = [
     },
 ]
 
-schedule = {
+default_schedule = {
     "active": True,
     "startHour": 9,
     "startMinute": 0,
@@ -233,17 +478,322 @@ schedule = {
     "intervalMinutes": 60,
 }
 
-abbreviations_extra: list[str] = []
+default_abbreviations = [
+    abbr.strip() for abbr in os.getenv("ABBREVIATIONS_EXTRA", "").split(",") if abbr.strip()
+]
+
+default_settings = {
+    "schedule": default_schedule,
+    "abbreviations": default_abbreviations,
+}
 
 user_id_cache: dict[str, str] = {}
 
 
+# ------------------------
+# Admission Control
+# ------------------------
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def wait_time(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> float:
+        wait = self.wait_time()
+        if wait == 0:
+            self.tokens -= 1
+        return wait
+
+
+class AdmissionController:
+    def __init__(self) -> None:
+        self.limits = {
+            "cheap": ADMISSION_CHEAP_CONCURRENCY,
+            "ingest": ADMISSION_INGEST_CONCURRENCY,
+            "expensive": ADMISSION_EXPENSIVE_CONCURRENCY,
+        }
+        self.rates = {
+            "cheap": (ADMISSION_CHEAP_RATE, ADMISSION_CHEAP_BURST),
+            "ingest": (ADMISSION_INGEST_RATE / 60, ADMISSION_INGEST_BURST),
+            "expensive": (ADMISSION_EXPENSIVE_RATE / 60, ADMISSION_EXPENSIVE_BURST),
+        }
+        self.in_flight = {"cheap": 0, "ingest": 0, "expensive": 0}
+        self.rejected = {"rateLimited": 0, "saturated": 0}
+        self.buckets: OrderedDict[tuple[str, str], TokenBucket] = OrderedDict()
+
+    @staticmethod
+    def pool_for(method: str, path: str) -> str:
+        if (method, path.rstrip("/")) in INGEST_ROUTES:
+            return "ingest"
+        for route_method, prefix in EXPENSIVE_ROUTES:
+            if method == route_method and path.startswith(prefix):
+                return "expensive"
+        return "cheap"
+
+    @staticmethod
+    def client_key(scope) -> str:
+        if ADMISSION_TRUST_PROXY:
+            for name, value in scope.get("headers", []):
+                if name == b"x-forwarded-for" and value:
+                    return value.decode("latin-1").split(",")[0].strip()[:64]
+        client = scope.get("client")
+        return client[0] if client else "-"
+
+    def bucket(self, pool: str, client: str) -> TokenBucket:
+        key = (pool, client)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(*self.rates[pool])
+            self.buckets[key] = bucket
+            if len(self.buckets) > ADMISSION_MAX_CLIENTS:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket
+
+    def admit(self, scope) -> tuple[str, Optional[JSONResponse]]:
+        pool = self.pool_for(scope["method"], scope["path"])
+        bucket = self.bucket(pool, self.client_key(scope))
+        wait = bucket.wait_time()
+        if wait > 0:
+            self.rejected["rateLimited"] += 1
+            return pool, JSONResponse(
+                {"detail": "Rate limit exceeded"},
+                status_code=429,
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+        if self.in_flight[pool] >= self.limits[pool]:
+            self.rejected["saturated"] += 1
+            return pool, JSONResponse(
+                {"detail": "Server busy"},
+                status_code=503,
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER[pool])},
+            )
+        bucket.take()
+        self.in_flight[pool] += 1
+        return pool, None
+
+    def release(self, pool: str) -> None:
+        self.in_flight[pool] -= 1
+
+    def metrics(self) -> dict:
+        return {
+            "inFlight": dict(self.in_flight),
+            "limits": dict(self.limits),
+            "rejected": dict(self.rejected),
+            "trackedClients": len(self.buckets),
+        }
+
+
+admission_controller = AdmissionController()
+
+
+# ------------------------
+# Async Data Layer
+# ------------------------
+
+
+class SharedHTTP:
+    def __init__(self) -> None:
+        self.client: Optional[httpx.AsyncClient] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+
+    def http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self.client is None or self.client.is_closed or self.loop is not loop:
+            import httpx
+
+            self.client = httpx.AsyncClient(limits=httpx.Limits(max_connections=100, max_keepalive_connections=20))
+            self.loop = loop
+        return self.client
+
+    async def aclose(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        return await self.http().request(method, url, **kwargs)
+
+    async def request_once(self, method: str, url: str, **kwargs) -> httpx.Response:
+        import httpx
+
+        async with httpx.AsyncClient() as client:
+            return await client.request(method, url, **kwargs)
+
+    def call(self, method: str, url: str, **kwargs) -> httpx.Response:
+        loop = self.loop
+        if loop is not None and loop.is_running():
+            return asyncio.run_coroutine_threadsafe(self.request(method, url, **kwargs), loop).result()
+        return asyncio.run(self.request_once(method, url, **kwargs))
+
+
+shared_http = SharedHTTP()
+
+
+class DatabaseExecutor:
+    def __init__(self) -> None:
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.limiters: dict[str, CapacityLimiter] = {}
+
+    def limiter(self, kind: str) -> CapacityLimiter:
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.limiters = {
+                "read": CapacityLimiter(DB_READERS),
+                "write": CapacityLimiter(1),
+                "job": CapacityLimiter(DB_JOB_WORKERS),
+            }
+            self.loop = loop
+        return self.limiters[kind]
+
+    async def run(self, kind: str, fn, *args, **kwargs):
+        return await to_thread.run_sync(functools.partial(fn, *args, **kwargs), limiter=self.limiter(kind))
+
+    def submit(self, kind: str, fn, *args, **kwargs) -> concurrent.futures.Future:
+        loop = self.loop
+        if loop is not None and loop.is_running():
+            return asyncio.run_coroutine_threadsafe(self.run(kind, fn, *args, **kwargs), loop)
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+    def metrics(self) -> dict:
+        return {
+            kind: {
+                "capacity": int(limiter.total_tokens),
+                "busy": limiter.borrowed_tokens,
+                "waiting": limiter.statistics().tasks_waiting,
+            }
+            for kind, limiter in self.limiters.items()
+        }
+
+
+db_executor = DatabaseExecutor()
+
+
+def run_in(kind: str):
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def route(*args, **kwargs):
+            return await db_executor.run(kind, fn, *args, **kwargs)
+
+        return route
+
+    return decorate
+
+
 # ------------------------
 # LLM Helpers (Ollama)
 # ------------------------
 
+LLM_PRIORITY_WEIGHTS = {"interactive": 8, "feed": 3, "backfill": 1}
+
+llm_priority: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default="feed")
+llm_enabled: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_enabled", default=True)
+
+
+def llm_active() -> bool:
+    return USE_LLM and llm_enabled.get()
+
+
+@contextmanager
+def llm_disabled() -> Iterator[None]:
+    token = llm_enabled.set(False)
+    try:
+        yield
+    finally:
+        llm_enabled.reset(token)
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int, interactive_reserved: int) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.interactive_reserved = max(0, min(interactive_reserved, self.max_concurrency - 1))
+        self.cond = threading.Condition()
+        self.queues: dict[str, deque] = {name: deque() for name in LLM_PRIORITY_WEIGHTS}
+        self.passes = {name: 0.0 for name in LLM_PRIORITY_WEIGHTS}
+        self.virtual_time = 0.0
+        self.in_flight = {name: 0 for name in LLM_PRIORITY_WEIGHTS}
+        self.completed = {name: 0 for name in LLM_PRIORITY_WEIGHTS}
+        self.waits: dict[str, deque] = {name: deque(maxlen=500) for name in LLM_PRIORITY_WEIGHTS}
+
+    def next_ticket(self) -> Optional[object]:
+        free = self.max_concurrency - sum(self.in_flight.values())
+        eligible = [
+            name
+            for name, queue in self.queues.items()
+            if queue and free > 0 and (name == "interactive" or free > self.interactive_reserved)
+        ]
+        if not eligible:
+            return None
+        return self.queues[min(eligible, key=self.passes.get)][0]
+
+    @contextmanager
+    def slot(self, priority: str):
+        if priority not in LLM_PRIORITY_WEIGHTS:
+            priority = "feed"
+        ticket = object()
+        enqueued_at = time.monotonic()
+        with self.cond:
+            if not self.queues[priority]:
+                self.passes[priority] = max(self.passes[priority], self.virtual_time)
+            self.queues[priority].append(ticket)
+            while self.next_ticket() is not ticket:
+                self.cond.wait()
+            self.queues[priority].popleft()
+            self.virtual_time = self.passes[priority]
+            self.passes[priority] += 1 / LLM_PRIORITY_WEIGHTS[priority]
+            self.in_flight[priority] += 1
+            self.waits[priority].append(time.monotonic() - enqueued_at)
+            self.cond.notify_all()
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.in_flight[priority] -= 1
+                self.completed[priority] += 1
+                self.cond.notify_all()
+
+    def metrics(self) -> dict:
+        with self.cond:
+            classes = {}
+            for name in LLM_PRIORITY_WEIGHTS:
+                waits = sorted(self.waits[name])
+                classes[name] = {
+                    "queued": len(self.queues[name]),
+                    "inFlight": self.in_flight[name],
+                    "completed": self.completed[name],
+                    "waitMsP50": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+                    "waitMsP95": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+                    "waitMsMax": round(waits[-1] * 1000, 1) if waits else 0.0,
+                }
+            return {
+                "maxConcurrency": self.max_concurrency,
+                "interactiveReserved": self.interactive_reserved,
+                "classes": classes,
+            }
+
+
+llm_scheduler = LLMScheduler(LLM_MAX_CONCURRENCY, LLM_INTERACTIVE_RESERVED)
+
+
 def call_ollama(text_de: str) -> list[dict]:
-    if not USE_LLM:
+    if not llm_active():
         return []
     if len(text_de or "") > 400:
         return []
@@ -268,8 +818,8 @@ def call_ollama(text_de: str) -> list[dict]:
         "format": "json",
     }
     try:
-        with httpx.Client(timeout=120) as client:
-            res = client.post(f"{OLLAMA_BASE_URL}/api/generate", json=payload)
+        with llm_scheduler.slot(llm_priority.get()):
+            res = shared_http.call("POST", f"{OLLAMA_BASE_URL}/api/generate", json=payload, timeout=120)
             res.raise_for_status()
             data = res.json().get("response", "")
             obj = json.loads(data)
@@ -278,28 +828,81 @@ def call_ollama(text_de: str) -> list[dict]:
         return []
 
 
-def translate_ollama(text_de: str) -> str:
-    if not USE_LLM:
-        return "(未翻訳)"
+def request_translation(text_de: str, hint: Optional[tuple[str, str]] = None) -> tuple[str, int]:
+    if not llm_active():
+        return "(未翻訳)", 0
     if len(text_de or "") > 800:
-        return "(未翻訳)"
+        return "(未翻訳)", 0
     prompt = (
         "Translate the following German text into natural Japanese. "
         "Return only the Japanese translation, no extra text.\n"
-        "German:\n" + text_de
     )
+    if hint:
+        prompt += (
+            "A similar sentence was translated before; keep its wording where it fits.\n"
+            f"German: {hint[0]}\nJapanese: {hint[1]}\n"
+        )
+    prompt += "German:\n" + text_de
+    payload = {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": False,
+    }
+    try:
+        with llm_scheduler.slot(llm_priority.get()):
+            res = shared_http.call("POST", f"{OLLAMA_BASE_URL}/api/generate", json=payload, timeout=120)
+            res.raise_for_status()
+            data = res.json()
+            tokens = int(data.get("prompt_eval_count") or 0) + int(data.get("eval_count") or 0)
+            return data.get("response", "").strip() or "(未翻訳)", tokens
+    except Exception:
+        return "(未翻訳)", 0
+
+
+def request_segment_translations(
+    segments: list[str], hints: list[Optional[tuple[str, str]]]
+) -> tuple[Optional[list[str]], int]:
+    if len(segments) == 1:
+        translated, tokens = request_translation(segments[0], hints[0])
+        return (None if translated == "(未翻訳)" else [translated]), tokens
+    if not llm_active() or sum(len(segment) for segment in segments) > 800:
+        return None, 0
+    prompt = (
+        "Translate the numbered German sentences into natural Japanese. "
+        "They are consecutive sentences of one text, so keep names, terms and tone consistent. "
+        'Return only JSON: {"translations":["...", ...]} with exactly one entry per sentence, in order.\n'
+    )
+    examples = [hint for hint in hints if hint]
+    if examples:
+        prompt += "Similar sentences were translated before; keep their wording where it fits.\n"
+        for source_de, target_ja in examples:
+            prompt += f"German: {source_de}\nJapanese: {target_ja}\n"
+    prompt += "Sentences:\n" + "\n".join(f"{i + 1}. {segment}" for i, segment in enumerate(segments))
     payload = {
         "model": OLLAMA_MODEL,
         "prompt": prompt,
         "stream": False,
+        "format": "json",
     }
     try:
-        with httpx.Client(timeout=120) as client:
-            res = client.post(f"{OLLAMA_BASE_URL}/api/generate", json=payload)
+        with llm_scheduler.slot(llm_priority.get()):
+            res = shared_http.call("POST", f"{OLLAMA_BASE_URL}/api/generate", json=payload, timeout=120)
             res.raise_for_status()
-            return res.json().get("response", "").strip() or "(未翻訳)"
+            data = res.json()
+        tokens = int(data.get("prompt_eval_count") or 0) + int(data.get("eval_count") or 0)
+        translations = json.loads(data.get("response", "")).get("translations")
     except Exception:
-        return "(未翻訳)"
+        return None, 0
+    if not isinstance(translations, list) or len(translations) != len(segments):
+        return None, tokens
+    translations = [str(t).strip() for t in translations]
+    if not all(translations):
+        return None, tokens
+    return translations, tokens
+
+
+def translate_ollama(text_de: str) -> str:
+    return request_translation(text_de)[0]
 
 
 def needs_japanese(text: str) -> bool:
@@ -327,21 +930,314 @@ def looks_like_verb(text: str) -> bool:
     t = (text or "").strip().lower()
     if t.startswith("sich "):
         return True
-    return t.endswith("en")
+    words = t.split()
+    if not words or words[0] in ("der", "die", "das"):
+        return False
+    if words[-1] in german_lexicon().verbs:
+        return True
+    return t.endswith("en") and not (text or "").strip()[:1].isupper()
+
+
+def enrich_lexemes_ollama(text_de: str, lexemes: list[dict]) -> None:
+    if not llm_active() or not lexemes:
+        return
+    prompt = (
+        "あなたはベルリン在住の日本人学習者向けのドイツ語コーチです。"
+        "以下の文に出てくる各語句について、文脈に合った日本語の意味(meaningJa)と"
+        "日本語の語源説明(etymology)を答えてください。英語は禁止。"
+        "出力はJSONのみで厳密に: {\"items\": [{\"textDe\": ..., \"meaningJa\": ..., \"etymology\": ...}]}\n"
+        "Sentence:\n" + text_de + "\nItems:\n" + "\n".join(f"- {lex['textDe']}" for lex in lexemes)
+    )
+    payload = {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": False,
+        "format": "json",
+    }
+    try:
+        with llm_scheduler.slot(llm_priority.get()):
+            res = shared_http.call("POST", f"{OLLAMA_BASE_URL}/api/generate", json=payload, timeout=120)
+            res.raise_for_status()
+            items = json.loads(res.json().get("response", "")).get("items", [])
+    except Exception:
+        return
+    by_text = {str(item.get("textDe", "")).strip().lower(): item for item in items if isinstance(item, dict)}
+    for index, lex in enumerate(lexemes):
+        item = by_text.get(lex["textDe"].lower())
+        if item is None and index < len(items) and isinstance(items[index], dict):
+            item = items[index]
+        if item:
+            lex["meaningJa"] = item.get("meaningJa") or lex["meaningJa"]
+            lex["etymology"] = item.get("etymology") or lex["etymology"]
+
+
+# ------------------------
+# Local German Analysis
+# ------------------------
+
+NOUN_SUFFIX_GENDERS = [
+    ("ung", "die"), ("heit", "die"), ("keit", "die"), ("schaft", "die"), ("tion", "die"),
+    ("sion", "die"), ("tät", "die"), ("ik", "die"), ("ei", "die"),
+    ("chen", "das"), ("lein", "das"), ("ment", "das"), ("um", "das"),
+    ("ling", "der"), ("ismus", "der"), ("or", "der"),
+]
+NOUN_ENDINGS = ("", "en", "n", "e", "er", "s", "es")
+CEFR_LEVELS = ["A1", "A2", "B1", "B2", "C1", "C2"]
+FREQ_RANK_SCALE = 5000
+AUXILIARY_VERBS = {"sein", "haben", "werden"}
+WORD_RE = re.compile(r"[A-Za-zÄÖÜäöüß]+(?:-[A-Za-zÄÖÜäöüß]+)*")
+
+
+class GermanLexicon:
+    def __init__(self, data_dir: str) -> None:
+        self.nouns: dict[str, tuple[str, str]] = {}
+        self.verbs: dict[str, tuple[str, str, str]] = {}
+        self.verb_forms: dict[str, list[str]] = {}
+        self.patterns: dict[str, list[tuple[str, str, str]]] = {}
+        self.ranks: dict[str, int] = {}
+        for lemma, gender in self.read(data_dir, "nouns_de.tsv"):
+            self.nouns[lemma.lower()] = (lemma, gender)
+        for infinitive, present, preterite, participle in self.read(data_dir, "verbs_de.tsv"):
+            self.verbs[infinitive] = (present, preterite, participle)
+            for form in (infinitive, present.split()[0], preterite.split()[0], participle):
+                self.verb_forms.setdefault(form.lower(), []).append(infinitive)
+        for lemma, preposition, case in self.read(data_dir, "prepositions_de.tsv"):
+            self.patterns.setdefault(lemma.split()[-1].lower(), []).append((lemma, preposition, case))
+        for word, rank in self.read(data_dir, "freq_de.tsv"):
+            self.ranks.setdefault(word.lower(), int(rank))
+        self.rarities: dict[str, float] = {}
+
+    def rarity(self, token: str) -> float:
+        lower = token.lower()
+        cached = self.rarities.get(lower)
+        if cached is not None:
+            return cached
+        candidates = [lower[: len(lower) - len(e)] for e in NOUN_ENDINGS if lower.endswith(e)]
+        candidates += [c + "en" for c in candidates] + [f.lower() for f in self.verb_forms.get(lower, [])]
+        ranks = [self.ranks[c] for c in candidates if c in self.ranks]
+        value = min(math.log(min(ranks) + 1) / math.log(FREQ_RANK_SCALE), 1.0) if ranks else 1.0
+        self.rarities[lower] = value
+        return value
+
+    @staticmethod
+    def read(data_dir: str, name: str) -> list[list[str]]:
+        path = os.path.join(data_dir, name)
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [
+                line.rstrip("\n").split("\t")
+                for line in f
+                if line.strip() and not line.startswith("#")
+            ]
+
+    def noun(self, token: str) -> Optional[tuple[str, str]]:
+        lower = token.lower()
+        for ending in NOUN_ENDINGS:
+            if ending and not lower.endswith(ending):
+                continue
+            stem = lower[: len(lower) - len(ending)]
+            if stem in self.nouns:
+                lemma, gender = self.nouns[stem]
+                return token[: len(stem)] if len(stem) == len(lemma) else lemma, gender
+        for start in range(1, len(lower) - 2):
+            for ending in NOUN_ENDINGS:
+                if ending and not lower.endswith(ending):
+                    continue
+                stem = lower[start: len(lower) - len(ending)]
+                if start >= 3 and len(stem) >= 3 and stem in self.nouns:
+                    return token[: len(lower) - len(ending)], self.nouns[stem][1]
+        for suffix, gender in NOUN_SUFFIX_GENDERS:
+            if lower.endswith(suffix) and len(lower) > len(suffix) + 2:
+                return token, gender
+        return None
+
+    def verb(self, token: str, following: list[str]) -> Optional[str]:
+        lower = token.lower()
+        infinitives = self.verb_forms.get(lower, [])
+        for infinitive in infinitives:
+            particle = self.verbs[infinitive][0].split()[1:]
+            if lower in (infinitive, self.verbs[infinitive][2]) or (particle and particle[0] in following):
+                return infinitive
+        for infinitive in infinitives:
+            if len(self.verbs[infinitive][0].split()) == 1:
+                return infinitive
+        return None
+
+    def verb_forms_text(self, infinitive: str) -> str:
+        _, preterite, participle = self.verbs[infinitive]
+        return f"{infinitive} – {preterite} – {participle}"
+
+    def pattern(self, lemma: str, tokens: set[str]) -> Optional[str]:
+        for full, preposition, case in self.patterns.get(lemma.split()[-1].lower(), []):
+            if preposition in tokens:
+                return f"{full} {preposition} + {case}"
+        return None
+
+
+german_lexicon_instance: Optional[GermanLexicon] = None
+german_lexicon_lock = threading.Lock()
+
+
+def german_lexicon() -> GermanLexicon:
+    global german_lexicon_instance
+    if german_lexicon_instance is None:
+        with german_lexicon_lock:
+            if german_lexicon_instance is None:
+                german_lexicon_instance = GermanLexicon(GERMAN_LEXICON_DIR)
+    return german_lexicon_instance
+
+
+def analyze_german(text_de: str) -> list[dict]:
+    lexicon = german_lexicon()
+    words = WORD_RE.findall(text_de or "")
+    lowered = [w.lower() for w in words]
+    token_set = set(lowered)
+    verbs: list[dict] = []
+    nouns: list[dict] = []
+    seen: set[str] = set()
+    for index, word in enumerate(words):
+        infinitive = lexicon.verb(word, lowered[index + 1:])
+        if infinitive and infinitive not in AUXILIARY_VERBS and infinitive not in seen:
+            seen.add(infinitive)
+            verbs.append({
+                "textDe": infinitive,
+                "meaningJa": "",
+                "gender": "none",
+                "etymology": "",
+                "prepositionPattern": lexicon.pattern(infinitive, token_set),
+                "verbForms": lexicon.verb_forms_text(infinitive),
+            })
+            continue
+        if not word[:1].isupper() or len(word) < 3:
+            continue
+        match = lexicon.noun(word)
+        if not match or (index == 0 and match[0].lower() not in lexicon.nouns):
+            continue
+        lemma, gender = match
+        text = f"{gender} {lemma}"
+        if text in seen:
+            continue
+        seen.add(text)
+        nouns.append({
+            "textDe": text,
+            "meaningJa": "",
+            "gender": gender,
+            "etymology": "",
+            "prepositionPattern": lexicon.pattern(lemma, token_set),
+            "verbForms": None,
+        })
+    verbs.sort(key=lambda lex: lex["prepositionPattern"] is None)
+    nouns.sort(key=lambda lex: (lex["prepositionPattern"] is None, -len(lex["textDe"])))
+    return (verbs + nouns)[:LEXEME_MAX_CANDIDATES]
+
+
+def apply_local_analysis(lexemes: list[dict]) -> list[dict]:
+    lexicon = german_lexicon()
+    for lex in lexemes:
+        words = str(lex.get("textDe", "")).split()
+        if not words:
+            continue
+        if lex.get("gender") not in ("der", "die", "das", "none") and words[0].lower() not in ("der", "die", "das"):
+            match = lexicon.noun(words[-1]) if words[-1][:1].isupper() else None
+            lex["gender"] = match[1] if match else "none"
+        if not lex.get("verbForms") and words[-1].lower() in lexicon.verbs:
+            lex["verbForms"] = lexicon.verb_forms_text(words[-1].lower())
+        if not lex.get("prepositionPattern"):
+            lex["prepositionPattern"] = lexicon.pattern(words[-1], {w.lower() for w in words})
+    return lexemes
+
+
+def fill_known_meanings(lexemes: list[dict]) -> None:
+    texts = [lex["textDe"] for lex in lexemes]
+    if not texts:
+        return
+    with get_db() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT text_de, meaning_ja, etymology FROM lexemes
+            WHERE text_de IN ({', '.join('?' for _ in texts)}) AND meaning_ja != ''
+            ORDER BY created_at DESC
+            """,
+            texts,
+        ).fetchall()
+    known: dict[str, sqlite3.Row] = {}
+    for r in rows:
+        if r["text_de"] not in known and not needs_japanese(r["meaning_ja"]):
+            known[r["text_de"]] = r
+    for lex in lexemes:
+        if lex["textDe"] in known:
+            lex["meaningJa"] = known[lex["textDe"]]["meaning_ja"]
+            lex["etymology"] = known[lex["textDe"]]["etymology"]
+
+
+def extract_lexemes(text_de: str) -> list[dict]:
+    candidates = analyze_german(text_de)
+    if not candidates:
+        return apply_local_analysis(call_ollama(text_de))
+    fill_known_meanings(candidates)
+    enrich_lexemes_ollama(text_de, [lex for lex in candidates if not lex["meaningJa"]])
+    return candidates
 
 
 # ------------------------
 # X API Helpers
 # ------------------------
 
+SCHEMA_VERSION = 15
+SYNC_TABLES = [("sentences", "sentence", None), ("lexemes", "lexeme", None), ("cards", "card", "user_id")]
+
+
+sql_logger = logging.getLogger("berlincoach.sql")
+slow_queries: deque = deque(maxlen=200)
+
+
+def record_query_time(sql: str, started: float) -> None:
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms < SLOW_QUERY_MS:
+        return
+    statement = " ".join(sql.split())[:500]
+    slow_queries.append({"at": iso(datetime.now(timezone.utc)), "ms": round(elapsed_ms, 2), "sql": statement})
+    sql_logger.warning("slow query %.1f ms: %s", elapsed_ms, statement)
+
+
+class SlowQueryConnection(sqlite3.Connection):
+    def execute(self, sql, parameters=(), /):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            record_query_time(sql, started)
+
+    def executemany(self, sql, parameters, /):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, parameters)
+        finally:
+            record_query_time(sql, started)
+
+
 def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+    if SLOW_QUERY_MS > 0:
+        conn = sqlite3.connect(DB_PATH, factory=SlowQueryConnection)
+    else:
+        conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     return conn
 
 
 def init_db() -> None:
     with get_db() as conn:
+        if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        previous_version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if previous_version >= SCHEMA_VERSION:
+            conn.rollback()
+            return
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS sentences (
@@ -380,10 +1276,147 @@ def init_db() -> None:
                 status TEXT NOT NULL,
                 due_at TEXT,
                 created_at TEXT NOT NULL,
+                user_id TEXT NOT NULL DEFAULT 'default',
                 FOREIGN KEY(lexeme_id) REFERENCES lexemes(id)
             )
             """
         )
+        if "user_id" not in {r["name"] for r in conn.execute("PRAGMA table_info(cards)")}:
+            conn.execute("ALTER TABLE cards ADD COLUMN user_id TEXT NOT NULL DEFAULT 'default'")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id TEXT PRIMARY KEY,
+                name TEXT NOT NULL UNIQUE,
+                token_hash TEXT UNIQUE,
+                created_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO users (id, name, token_hash, created_at) VALUES (?, ?, NULL, ?)",
+            (DEFAULT_USER_ID, DEFAULT_USER_ID, iso(datetime.now(timezone.utc))),
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS card_reviews (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                card_id TEXT NOT NULL,
+                rating TEXT NOT NULL,
+                previous_status TEXT NOT NULL,
+                reviewed_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_card_reviews_user ON card_reviews(user_id, reviewed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_card_reviews_card ON card_reviews(card_id)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS enrichment_jobs (
+                sentence_id TEXT PRIMARY KEY,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                enqueued_at TEXT NOT NULL,
+                FOREIGN KEY(sentence_id) REFERENCES sentences(id)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS x_user_ids (
+                handle TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                resolved_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS x_sync_state (
+                source_id TEXT PRIMARY KEY,
+                since_id TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value_json TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS settings_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute("INSERT OR IGNORE INTO settings_version (id, version) VALUES (1, 0)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sentence_minhash (
+                sentence_id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS minhash_bands (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                sentence_id TEXT NOT NULL,
+                PRIMARY KEY (band, bucket, sentence_id)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS near_duplicates (
+                text_de TEXT PRIMARY KEY,
+                sentence_id TEXT NOT NULL,
+                source_handle TEXT NOT NULL,
+                similarity REAL NOT NULL,
+                created_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translation_memory (
+                id INTEGER PRIMARY KEY,
+                source_de TEXT NOT NULL UNIQUE,
+                target_ja TEXT NOT NULL,
+                gram_count INTEGER NOT NULL,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tm_ngrams (
+                gram TEXT NOT NULL,
+                tm_id INTEGER NOT NULL,
+                PRIMARY KEY (gram, tm_id)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sentences_text_de ON sentences(text_de)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_lexemes_sentence_id ON lexemes(sentence_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_lexemes_text_de ON lexemes(text_de)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_lexeme_id ON cards(lexeme_id)")
+        conn.execute("DROP INDEX IF EXISTS idx_cards_status_due_at")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_user_status_due ON cards(user_id, status, due_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_user_lexeme ON cards(user_id, lexeme_id)")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_enrichment_jobs_enqueued ON enrichment_jobs(enqueued_at)"
+        )
         conn.execute(
             """
             CREATE TABLE IF NOT EXISTS sources (
@@ -397,38 +1430,362 @@ def init_db() -> None:
             )
             """
         )
-        conn.commit()
-
-    seed_sources_if_empty()
-
-
-def insert_sentence(text_de: str, text_ja: str, tags: list[str], source_handle: str) -> tuple[str, bool]:
-    with get_db() as conn:
-        existing = conn.execute(
-            "SELECT id FROM sentences WHERE text_de = ?",
-            (text_de,),
-        ).fetchone()
-        if existing:
-            return existing["id"], False
-        new_id = str(uuid4())
+        for table in ("card_status_counts", "card_due_days"):
+            columns = {r["name"] for r in conn.execute(f"PRAGMA table_info({table})")}
+            if columns and "user_id" not in columns:
+                conn.execute(f"DROP TABLE {table}")
         conn.execute(
             """
-            INSERT INTO sentences (id, text_de, text_ja, tags_json, source_handle, created_at)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (new_id, text_de, text_ja, json.dumps(tags), source_handle, iso(datetime.now(timezone.utc))),
+            CREATE TABLE IF NOT EXISTS card_status_counts (
+                user_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user_id, status)
+            )
+            """
         )
-        conn.commit()
-        return new_id, True
-
-
-def insert_lexemes(sentence_id: str, lexemes: list[dict]) -> None:
-    with get_db() as conn:
-        conn.execute("DELETE FROM lexemes WHERE sentence_id = ?", (sentence_id,))
-        for lex in normalize_lexemes_japanese(lexemes):
-            new_id = str(uuid4())
-            conn.execute(
-                """
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS card_due_days (
+                user_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user_id, day)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS feed_archive (
+                sha256 TEXT PRIMARY KEY,
+                source_handle TEXT,
+                rss_url TEXT NOT NULL,
+                raw_size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL,
+                fetch_count INTEGER NOT NULL,
+                first_fetched_at TEXT NOT NULL,
+                last_fetched_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_feed_archive_first_fetched ON feed_archive(first_fetched_at)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sentences_source_created ON sentences(source_handle, created_at)"
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS retention_policies (
+                source_handle TEXT PRIMARY KEY,
+                max_age_days INTEGER,
+                max_sentences INTEGER,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS retention_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_run_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "INSERT OR IGNORE INTO retention_state (id, last_run_at) VALUES (1, ?)",
+            (iso(datetime.now(timezone.utc)),),
+        )
+        sentence_columns = {r["name"] for r in conn.execute("PRAGMA table_info(sentences)")}
+        for column, kind in (("difficulty", "REAL"), ("level", "INTEGER"), ("score", "REAL")):
+            if column not in sentence_columns:
+                conn.execute(f"ALTER TABLE sentences ADD COLUMN {column} {kind}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sentences_level_score ON sentences(level, score)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sentences_score ON sentences(score)")
+        conn.execute("DROP INDEX IF EXISTS idx_cards_front")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cards_user_front ON cards(user_id, front)")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS score_dirty (
+                sentence_id TEXT PRIMARY KEY
+            )
+            """
+        )
+        if previous_version < 14:
+            conn.execute("INSERT OR IGNORE INTO score_dirty (sentence_id) SELECT id FROM sentences")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_rows (
+                row INTEGER PRIMARY KEY,
+                sentence_id TEXT NOT NULL UNIQUE
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_meta (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                entity TEXT NOT NULL,
+                entity_id TEXT NOT NULL,
+                op TEXT NOT NULL,
+                UNIQUE (entity, entity_id)
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS snapshots (
+                version INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS notification_slots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                slot_at TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                sentence_id TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                sent_at TEXT,
+                UNIQUE (slot_at, position)
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_notification_slots_status_slot ON notification_slots(status, slot_at, position)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_notification_slots_sentence ON notification_slots(sentence_id)")
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_sentences_pushable ON sentences(created_at)
+            WHERE text_ja NOT IN ('(未翻訳)', '(自動生成予定)')
+            """
+        )
+        conn.execute(
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_sentences_delete_slots AFTER DELETE ON sentences
+            BEGIN
+                DELETE FROM notification_slots WHERE sentence_id = OLD.id;
+            END
+            """
+        )
+        if "user_id" not in {r["name"] for r in conn.execute("PRAGMA table_info(change_log)")}:
+            conn.execute("ALTER TABLE change_log ADD COLUMN user_id TEXT")
+        for table, entity, owner in SYNC_TABLES:
+            for event, op, ref in (("INSERT", "upsert", "NEW"), ("UPDATE", "upsert", "NEW"), ("DELETE", "delete", "OLD")):
+                conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{event.lower()}_log")
+                conn.execute(
+                    f"""
+                    CREATE TRIGGER trg_{table}_{event.lower()}_log AFTER {event} ON {table}
+                    BEGIN
+                        INSERT OR REPLACE INTO change_log (entity, entity_id, op, user_id)
+                        VALUES ('{entity}', {ref}.id, '{op}', {f"{ref}.{owner}" if owner else "NULL"});
+                    END
+                    """
+                )
+            conn.execute(
+                f"""
+                INSERT OR IGNORE INTO change_log (entity, entity_id, op, user_id)
+                SELECT '{entity}', id, 'upsert', {owner or "NULL"} FROM {table} ORDER BY created_at
+                """
+            )
+        conn.execute(
+            """
+            UPDATE change_log SET user_id = COALESCE(
+                (SELECT user_id FROM cards WHERE cards.id = change_log.entity_id), ?
+            )
+            WHERE entity = 'card' AND user_id IS NULL
+            """,
+            (DEFAULT_USER_ID,),
+        )
+        seed_sources_if_empty(conn)
+        seed_cards_if_empty(conn)
+        rebuild_card_stats(conn)
+        index_missing_minhashes(conn)
+        seed_translation_memory(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+
+
+MINHASH_MASK = (1 << 64) - 1
+minhash_rng = random.Random(20260219)
+MINHASH_PERMUTATIONS = [
+    (minhash_rng.getrandbits(64) | 1, minhash_rng.getrandbits(64))
+    for _ in range(NEAR_DUP_PERMUTATIONS)
+]
+
+
+def shingle_hashes(text: str) -> set[int]:
+    tokens = re.findall(r"\w+", (text or "").lower())
+    shingles = set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+    return {
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for shingle in shingles
+    }
+
+
+def minhash_signature(text: str) -> array:
+    hashes = shingle_hashes(text) or {0}
+    return array("I", [
+        min([(a * h + b) & MINHASH_MASK for h in hashes]) >> 32
+        for a, b in MINHASH_PERMUTATIONS
+    ])
+
+
+def minhash_buckets(signature: array) -> list[int]:
+    rows = len(signature) // NEAR_DUP_BANDS
+    return [
+        int.from_bytes(
+            hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).digest(),
+            "big",
+            signed=True,
+        )
+        for band in range(NEAR_DUP_BANDS)
+    ]
+
+
+def minhash_similarity(a: array, b: array) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def index_sentence_minhash(conn: sqlite3.Connection, sentence_id: str, text_de: str) -> None:
+    signature = minhash_signature(text_de)
+    conn.execute(
+        "INSERT OR REPLACE INTO sentence_minhash (sentence_id, signature) VALUES (?, ?)",
+        (sentence_id, signature.tobytes()),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO minhash_bands (band, bucket, sentence_id) VALUES (?, ?, ?)",
+        [(band, bucket, sentence_id) for band, bucket in enumerate(minhash_buckets(signature))],
+    )
+
+
+def index_missing_minhashes(conn: sqlite3.Connection) -> int:
+    rows = conn.execute(
+        """
+        SELECT id, text_de FROM sentences
+        WHERE id NOT IN (SELECT sentence_id FROM sentence_minhash)
+        """
+    ).fetchall()
+    for row in rows:
+        index_sentence_minhash(conn, row["id"], row["text_de"])
+    return len(rows)
+
+
+def find_near_duplicate(conn: sqlite3.Connection, signature: array) -> Optional[tuple[str, float]]:
+    clauses = " OR ".join("(b.band = ? AND b.bucket = ?)" for _ in range(NEAR_DUP_BANDS))
+    params = [p for band, bucket in enumerate(minhash_buckets(signature)) for p in (band, bucket)]
+    rows = conn.execute(
+        f"""
+        SELECT DISTINCT h.sentence_id, h.signature
+        FROM minhash_bands b JOIN sentence_minhash h ON h.sentence_id = b.sentence_id
+        WHERE {clauses}
+        LIMIT ?
+        """,
+        params + [NEAR_DUP_MAX_CANDIDATES],
+    ).fetchall()
+    best: Optional[tuple[str, float]] = None
+    for r in rows:
+        similarity = minhash_similarity(signature, array("I", r["signature"]))
+        if similarity >= NEAR_DUP_THRESHOLD and (best is None or similarity > best[1]):
+            best = (r["sentence_id"], similarity)
+    return best
+
+
+def match_existing_sentence(conn: sqlite3.Connection, text_de: str, source_handle: str) -> Optional[str]:
+    row = conn.execute("SELECT id FROM sentences WHERE text_de = ?", (text_de,)).fetchone()
+    if row:
+        return row["id"]
+    row = conn.execute("SELECT sentence_id FROM near_duplicates WHERE text_de = ?", (text_de,)).fetchone()
+    if row:
+        return row["sentence_id"]
+    if not NEAR_DUP_ENABLED:
+        return None
+    match = find_near_duplicate(conn, minhash_signature(text_de))
+    if not match:
+        return None
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO near_duplicates (text_de, sentence_id, source_handle, similarity, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (text_de, match[0], source_handle, match[1], iso(datetime.now(timezone.utc))),
+    )
+    return match[0]
+
+
+def insert_sentence(text_de: str, text_ja: str, tags: list[str], source_handle: str) -> tuple[str, bool]:
+    with get_db() as conn:
+        existing = conn.execute(
+            "SELECT id FROM sentences WHERE text_de = ?",
+            (text_de,),
+        ).fetchone()
+        if existing:
+            return existing["id"], False
+        new_id = str(uuid4())
+        conn.execute(
+            """
+            INSERT INTO sentences (id, text_de, text_ja, tags_json, source_handle, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (new_id, text_de, text_ja, json.dumps(tags), source_handle, iso(datetime.now(timezone.utc))),
+        )
+        index_sentence_minhash(conn, new_id, text_de)
+        score_sentences(conn, [new_id])
+        conn.commit()
+        return new_id, True
+
+
+def store_sentence(text_de: str, source_handle: str, tm_stats: Optional[dict] = None) -> tuple[str, bool]:
+    with get_db() as conn:
+        existing_id = match_existing_sentence(conn, text_de, source_handle)
+        conn.commit()
+    if existing_id:
+        return existing_id, False
+    sentence_id, inserted = insert_sentence(
+        text_de=text_de,
+        text_ja=translate_with_memory(text_de, tm_stats),
+        tags=[source_handle],
+        source_handle=source_handle,
+    )
+    if inserted:
+        lexemes = extract_lexemes(text_de)
+        if lexemes:
+            insert_lexemes(sentence_id, lexemes)
+        index_sentence_embeddings([(sentence_id, text_de)])
+        notification_wakeup.set()
+    return sentence_id, inserted
+
+
+def insert_lexemes(sentence_id: str, lexemes: list[dict]) -> None:
+    with get_db() as conn:
+        conn.execute("DELETE FROM lexemes WHERE sentence_id = ?", (sentence_id,))
+        for lex in normalize_lexemes_japanese(lexemes):
+            new_id = str(uuid4())
+            conn.execute(
+                """
                 INSERT INTO lexemes (
                     id, sentence_id, text_de, meaning_ja, gender, etymology,
                     preposition_pattern, verb_forms, created_at
@@ -446,284 +1803,2292 @@ def insert_lexemes(sentence_id: str, lexemes: list[dict]) -> None:
                     iso(datetime.now(timezone.utc)),
                 ),
             )
+        score_sentences(conn, [sentence_id])
+        conn.commit()
+
+
+def tm_key(segment: str) -> str:
+    return re.sub(r"\s+", " ", segment or "").strip()
+
+
+def tm_grams(segment: str) -> set[str]:
+    tokens = ["^"] + re.findall(r"\w+", (segment or "").lower()) + ["$"]
+    return {" ".join(tokens[i:i + 3]) for i in range(len(tokens) - 2)}
+
+
+def tm_lookup(conn: sqlite3.Connection, segment: str) -> tuple[Optional[sqlite3.Row], float]:
+    row = conn.execute(
+        "SELECT id, source_de, target_ja, tokens FROM translation_memory WHERE source_de = ?",
+        (tm_key(segment),),
+    ).fetchone()
+    if row:
+        return row, 1.0
+    grams = tm_grams(segment)
+    shared: dict[int, int] = {}
+    for gram in grams:
+        for r in conn.execute(
+            "SELECT tm_id FROM tm_ngrams WHERE gram = ? ORDER BY tm_id DESC LIMIT ?",
+            (gram, TM_MAX_POSTINGS),
+        ):
+            shared[r["tm_id"]] = shared.get(r["tm_id"], 0) + 1
+    if not shared:
+        return None, 0.0
+    top_ids = sorted(shared, key=shared.get, reverse=True)[:5]
+    rows = conn.execute(
+        f"""
+        SELECT id, source_de, target_ja, tokens, gram_count FROM translation_memory
+        WHERE id IN ({', '.join('?' for _ in top_ids)})
+        """,
+        top_ids,
+    ).fetchall()
+    best: Optional[sqlite3.Row] = None
+    best_score = 0.0
+    for r in rows:
+        score = 2 * shared[r["id"]] / (len(grams) + r["gram_count"])
+        if score > best_score:
+            best, best_score = r, score
+    return best, min(best_score, 0.99)
+
+
+def tm_store(conn: sqlite3.Connection, segment: str, target_ja: str, tokens: int) -> None:
+    grams = tm_grams(segment)
+    cur = conn.execute(
+        """
+        INSERT OR IGNORE INTO translation_memory (source_de, target_ja, gram_count, tokens, created_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (tm_key(segment), target_ja, len(grams), tokens, iso(datetime.now(timezone.utc))),
+    )
+    if cur.rowcount == 1:
+        conn.executemany(
+            "INSERT OR IGNORE INTO tm_ngrams (gram, tm_id) VALUES (?, ?)",
+            [(gram, cur.lastrowid) for gram in grams],
+        )
+
+
+def seed_translation_memory(conn: sqlite3.Connection) -> None:
+    rows = conn.execute(
+        """
+        SELECT text_de, text_ja FROM sentences
+        WHERE text_ja NOT IN ('(未翻訳)', '(自動生成予定)')
+        """
+    ).fetchall()
+    setting = conn.execute("SELECT value_json FROM settings WHERE key = 'abbreviations'").fetchone()
+    extra = json.loads(setting["value_json"]) if setting else default_settings["abbreviations"]
+    abbreviations = ABBREVIATIONS_BASE | {abbr.strip() for abbr in extra if abbr.strip()}
+    for row in rows:
+        if len(split_sentences(row["text_de"], abbreviations)) == 1:
+            tm_store(conn, row["text_de"], row["text_ja"], 0)
+
+
+def new_tm_stats() -> dict:
+    return {"segments": 0, "exact": 0, "fuzzy": 0, "misses": 0, "tokensUsed": 0, "tokensSaved": 0}
+
+
+def tm_stats_summary(stats: dict) -> dict:
+    segments = stats["segments"]
+    return dict(
+        stats,
+        hitRate=round(stats["exact"] / segments, 3) if segments else 0.0,
+        fuzzyRate=round(stats["fuzzy"] / segments, 3) if segments else 0.0,
+    )
+
+
+def translate_with_memory(text_de: str, stats: Optional[dict] = None) -> str:
+    if not TM_ENABLED:
+        return translate_ollama(text_de)
+    stats = stats if stats is not None else new_tm_stats()
+    segments = split_sentences(text_de) or [text_de]
+    parts: list[Optional[str]] = []
+    missed: list[int] = []
+    hints: list[Optional[tuple[str, str]]] = []
+    with get_db() as conn:
+        for index, segment in enumerate(segments):
+            stats["segments"] += 1
+            match, score = tm_lookup(conn, segment)
+            if match is not None and score >= 1.0:
+                stats["exact"] += 1
+                stats["tokensSaved"] += match["tokens"]
+                parts.append(match["target_ja"])
+                continue
+            if match is not None and score >= TM_FUZZY_THRESHOLD:
+                hints.append((match["source_de"], match["target_ja"]))
+                stats["fuzzy"] += 1
+            else:
+                hints.append(None)
+                stats["misses"] += 1
+            parts.append(None)
+            missed.append(index)
+    if not missed:
+        return "".join(p for p in parts if p is not None)
+    translations, tokens = request_segment_translations([segments[i] for i in missed], hints)
+    stats["tokensUsed"] += tokens
+    if translations is None:
+        if len(missed) == 1:
+            return "(未翻訳)"
+        translated, tokens = request_translation(text_de)
+        stats["tokensUsed"] += tokens
+        return translated
+    with get_db() as conn:
+        for index, translated in zip(missed, translations):
+            tm_store(conn, segments[index], translated, tokens // len(missed))
+            parts[index] = translated
         conn.commit()
+    return "".join(p for p in parts if p is not None)
 
 
-def seed_cards_if_empty() -> None:
+def insert_sentences_batch(items: list[dict]) -> list[tuple[str, bool]]:
+    created_at = iso(datetime.now(timezone.utc))
+    texts = list({item["text"] for item in items})
+    known: dict[str, str] = {}
+    results: list[tuple[str, bool]] = []
     with get_db() as conn:
-        row = conn.execute("SELECT COUNT(*) as c FROM cards").fetchone()
-        if row and row["c"] > 0:
-            return
-        for c in cards:
-            lex_id = str(uuid4())
+        for start in range(0, len(texts), 500):
+            chunk = texts[start:start + 500]
+            rows = conn.execute(
+                f"SELECT id, text_de FROM sentences WHERE text_de IN ({', '.join('?' for _ in chunk)})",
+                chunk,
+            ).fetchall()
+            known.update({r["text_de"]: r["id"] for r in rows})
+        for item in items:
+            text = item["text"]
+            source = item.get("source") or "manual"
+            existing_id = known.get(text) or match_existing_sentence(conn, text, source)
+            if existing_id:
+                results.append((existing_id, False))
+                continue
+            new_id = str(uuid4())
             conn.execute(
                 """
-                INSERT INTO lexemes (id, sentence_id, text_de, meaning_ja, gender, etymology, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO sentences (id, text_de, text_ja, tags_json, source_handle, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
                 """,
-                (
-                    lex_id,
-                    sentences[0]["id"],
-                    c["front"],
-                    "",
-                    "",
-                    "",
-                    iso(datetime.now(timezone.utc)),
-                ),
+                (new_id, text, "(未翻訳)", json.dumps([source]), source, created_at),
             )
+            index_sentence_minhash(conn, new_id, text)
             conn.execute(
-                """
-                INSERT INTO cards (id, lexeme_id, front, back, status, due_at, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    c["id"],
-                    lex_id,
-                    c["front"],
-                    c["back"],
-                    c["status"],
-                    c["dueAt"],
-                    iso(datetime.now(timezone.utc)),
-                ),
+                "INSERT OR IGNORE INTO enrichment_jobs (sentence_id, attempts, enqueued_at) VALUES (?, 0, ?)",
+                (new_id, created_at),
             )
+            known[text] = new_id
+            results.append((new_id, True))
+        score_sentences(conn, [sentence_id for sentence_id, inserted in results if inserted])
         conn.commit()
+    return results
 
 
-def seed_sources_if_empty() -> None:
+def enqueue_enrichment(sentence_ids: list[str]) -> None:
+    enqueued_at = iso(datetime.now(timezone.utc))
     with get_db() as conn:
-        row = conn.execute("SELECT COUNT(*) as c FROM sources").fetchone()
-        if row and row["c"] > 0:
-            return
-        for s in sources:
-            conn.execute(
-                """
-                INSERT INTO sources (id, handle, type, rss_url, enabled, last_sync_at, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    s["id"],
-                    s["handle"],
-                    s.get("type", "rss"),
-                    s.get("rss_url"),
-                    1 if s.get("enabled", True) else 0,
-                    s.get("lastSyncAt"),
-                    iso(datetime.now(timezone.utc)),
-                ),
-            )
+        conn.executemany(
+            "INSERT OR IGNORE INTO enrichment_jobs (sentence_id, attempts, enqueued_at) VALUES (?, 0, ?)",
+            [(sentence_id, enqueued_at) for sentence_id in sentence_ids],
+        )
         conn.commit()
+    ensure_enrichment_worker()
 
 
-def fetch_cards(status: Optional[str]) -> list[dict]:
+def request_enrichment(sentence_ids: list[str]) -> None:
+    if not sentence_ids:
+        return
     with get_db() as conn:
-        seed_cards_if_empty()
-        if status:
-            rows = conn.execute(
-                "SELECT id, front, back, status, due_at FROM cards WHERE status = ?",
-                (status,),
-            ).fetchall()
-        else:
-            rows = conn.execute("SELECT id, front, back, status, due_at FROM cards").fetchall()
-    return [
-        {
-            "id": r["id"],
-            "front": r["front"],
-            "back": r["back"],
-            "status": r["status"],
-            "dueAt": r["due_at"],
+        queued = {
+            r["sentence_id"]
+            for r in conn.execute(
+                f"SELECT sentence_id FROM enrichment_jobs WHERE sentence_id IN ({', '.join('?' for _ in sentence_ids)})",
+                sentence_ids,
+            )
         }
-        for r in rows
-    ]
+    missing = [sentence_id for sentence_id in sentence_ids if sentence_id not in queued]
+    if missing:
+        db_executor.submit("write", enqueue_enrichment, missing)
+
 
+def fetch_text_de(table: str, row_id: str) -> Optional[str]:
+    with get_db() as conn:
+        row = conn.execute(f"SELECT text_de FROM {table} WHERE id = ?", (row_id,)).fetchone()
+    return row["text_de"] if row else None
+
+
+def count_enrichment_jobs() -> int:
+    with get_db() as conn:
+        row = conn.execute("SELECT COUNT(*) AS c FROM enrichment_jobs").fetchone()
+    return row["c"] if row else 0
 
-def backfill_translations(limit: int = 20) -> int:
+
+def process_enrichment_jobs(limit: int) -> int:
     with get_db() as conn:
         rows = conn.execute(
             """
-            SELECT id, text_de FROM sentences
-            WHERE text_ja IN ('(未翻訳)', '(自動生成予定)')
-            ORDER BY created_at DESC
+            SELECT j.sentence_id, s.text_de
+            FROM enrichment_jobs j JOIN sentences s ON s.id = j.sentence_id
+            ORDER BY j.enqueued_at
             LIMIT ?
             """,
             (limit,),
         ).fetchall()
-        if not rows:
-            return 0
-        for row in rows:
-            translated = translate_ollama(row["text_de"])
-            conn.execute(
-                "UPDATE sentences SET text_ja = ? WHERE id = ?",
-                (translated, row["id"]),
+        conn.execute(
+            "DELETE FROM enrichment_jobs WHERE sentence_id NOT IN (SELECT id FROM sentences)"
+        )
+        conn.commit()
+    enriched = []
+    for row in rows:
+        try:
+            translated = translate_with_memory(row["text_de"])
+            with get_db() as conn:
+                has_lexemes = conn.execute(
+                    "SELECT 1 FROM lexemes WHERE sentence_id = ? LIMIT 1", (row["sentence_id"],)
+                ).fetchone()
+            lexemes = None if has_lexemes else extract_lexemes(row["text_de"])
+            if lexemes:
+                insert_lexemes(row["sentence_id"], lexemes)
+            with get_db() as conn:
+                conn.execute(
+                    "UPDATE sentences SET text_ja = ? WHERE id = ?",
+                    (translated, row["sentence_id"]),
+                )
+                conn.execute("DELETE FROM enrichment_jobs WHERE sentence_id = ?", (row["sentence_id"],))
+                conn.commit()
+            enriched.append((row["sentence_id"], row["text_de"]))
+        except Exception:
+            with get_db() as conn:
+                conn.execute(
+                    """
+                    UPDATE enrichment_jobs SET attempts = attempts + 1, enqueued_at = ?
+                    WHERE sentence_id = ?
+                    """,
+                    (iso(datetime.now(timezone.utc)), row["sentence_id"]),
+                )
+                conn.execute("DELETE FROM enrichment_jobs WHERE attempts >= 3")
+                conn.commit()
+    index_sentence_embeddings(enriched)
+    if enriched:
+        notification_wakeup.set()
+    return len(rows)
+
+
+enrichment_wakeup = threading.Event()
+enrichment_worker_lock = threading.Lock()
+enrichment_worker: Optional[threading.Thread] = None
+
+
+def run_enrichment_worker() -> None:
+    llm_priority.set("backfill")
+    while True:
+        enrichment_wakeup.clear()
+        try:
+            processed = process_enrichment_jobs(ENRICH_WORKER_BATCH)
+        except Exception:
+            processed = 0
+        if not processed:
+            enrichment_wakeup.wait(timeout=30)
+
+
+def ensure_enrichment_worker() -> None:
+    global enrichment_worker
+    with enrichment_worker_lock:
+        if enrichment_worker is None or not enrichment_worker.is_alive():
+            enrichment_worker = threading.Thread(
+                target=run_enrichment_worker, name="enrichment-worker", daemon=True
+            )
+            enrichment_worker.start()
+    enrichment_wakeup.set()
+
+
+settings_cache: dict = {"version": None, "checked_at": 0.0, "values": {}}
+settings_lock = threading.Lock()
+
+
+def load_setting(key: str):
+    checked_at = time.monotonic()
+    with settings_lock:
+        if checked_at - settings_cache["checked_at"] >= SETTINGS_POLL_SECONDS:
+            with get_db() as conn:
+                row = conn.execute("SELECT version FROM settings_version WHERE id = 1").fetchone()
+                version = row["version"] if row else 0
+                if version != settings_cache["version"]:
+                    rows = conn.execute("SELECT key, value_json FROM settings").fetchall()
+                    settings_cache["values"] = {r["key"]: json.loads(r["value_json"]) for r in rows}
+                    settings_cache["version"] = version
+            settings_cache["checked_at"] = checked_at
+        return settings_cache["values"].get(key, default_settings[key])
+
+
+def save_setting(key: str, value) -> None:
+    with get_db() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO settings (key, value_json, updated_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), iso(datetime.now(timezone.utc))),
+        )
+        conn.execute("UPDATE settings_version SET version = version + 1 WHERE id = 1")
+        conn.commit()
+    with settings_lock:
+        settings_cache["checked_at"] = 0.0
+
+
+def seed_cards_if_empty(conn: sqlite3.Connection) -> None:
+    row = conn.execute("SELECT COUNT(*) as c FROM cards").fetchone()
+    if row and row["c"] > 0:
+        return
+    for c in cards:
+        lex_id = str(uuid4())
+        conn.execute(
+            """
+            INSERT INTO lexemes (id, sentence_id, text_de, meaning_ja, gender, etymology, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                lex_id,
+                sentences[0]["id"],
+                c["front"],
+                "",
+                "",
+                "",
+                iso(datetime.now(timezone.utc)),
+            ),
+        )
+        conn.execute(
+            """
+            INSERT INTO cards (id, lexeme_id, front, back, status, due_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                c["id"],
+                lex_id,
+                c["front"],
+                c["back"],
+                c["status"],
+                c["dueAt"],
+                iso(datetime.now(timezone.utc)),
+            ),
+        )
+
+
+def seed_sources_if_empty(conn: sqlite3.Connection) -> None:
+    row = conn.execute("SELECT COUNT(*) as c FROM sources").fetchone()
+    if row and row["c"] > 0:
+        return
+    for s in sources:
+        conn.execute(
+            """
+            INSERT INTO sources (id, handle, type, rss_url, enabled, last_sync_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                s["id"],
+                s["handle"],
+                s.get("type", "rss"),
+                s.get("rss_url"),
+                1 if s.get("enabled", True) else 0,
+                s.get("lastSyncAt"),
+                iso(datetime.now(timezone.utc)),
+            ),
+        )
+
+
+def card_due_day(status: str, due_at: Optional[str]) -> Optional[str]:
+    if status == "learned":
+        return None
+    if not due_at:
+        return ""
+    return iso(datetime.fromisoformat(due_at))[:10]
+
+
+def apply_card_stats(
+    conn: sqlite3.Connection, user_id: str, status: str, due_at: Optional[str], delta: int
+) -> None:
+    conn.execute(
+        """
+        INSERT INTO card_status_counts (user_id, status, count) VALUES (?, ?, ?)
+        ON CONFLICT(user_id, status) DO UPDATE SET count = count + excluded.count
+        """,
+        (user_id, status, delta),
+    )
+    day = card_due_day(status, due_at)
+    if day is not None:
+        conn.execute(
+            """
+            INSERT INTO card_due_days (user_id, day, count) VALUES (?, ?, ?)
+            ON CONFLICT(user_id, day) DO UPDATE SET count = count + excluded.count
+            """,
+            (user_id, day, delta),
+        )
+
+
+def compute_card_stats(
+    conn: sqlite3.Connection,
+) -> tuple[dict[tuple[str, str], int], dict[tuple[str, str], int]]:
+    statuses: dict[tuple[str, str], int] = {}
+    days: dict[tuple[str, str], int] = {}
+    for r in conn.execute(
+        "SELECT user_id, status, due_at, COUNT(*) AS c FROM cards GROUP BY user_id, status, due_at"
+    ):
+        key = (r["user_id"], r["status"])
+        statuses[key] = statuses.get(key, 0) + r["c"]
+        day = card_due_day(r["status"], r["due_at"])
+        if day is not None:
+            days[(r["user_id"], day)] = days.get((r["user_id"], day), 0) + r["c"]
+    return statuses, days
+
+
+def rebuild_card_stats(conn: sqlite3.Connection) -> None:
+    statuses, days = compute_card_stats(conn)
+    conn.execute("DELETE FROM card_status_counts")
+    conn.execute("DELETE FROM card_due_days")
+    conn.executemany(
+        "INSERT INTO card_status_counts (user_id, status, count) VALUES (?, ?, ?)",
+        [(user_id, status, count) for (user_id, status), count in statuses.items()],
+    )
+    conn.executemany(
+        "INSERT INTO card_due_days (user_id, day, count) VALUES (?, ?, ?)",
+        [(user_id, day, count) for (user_id, day), count in days.items()],
+    )
+
+
+def fetch_card_stats(user_id: str, days: int = 30) -> dict:
+    today = datetime.now(timezone.utc).date()
+    horizon = today + timedelta(days=days - 1)
+    with get_db() as conn:
+        by_status = {
+            r["status"]: r["count"]
+            for r in conn.execute(
+                "SELECT status, count FROM card_status_counts WHERE user_id = ? AND count != 0", (user_id,)
+            )
+        }
+        unscheduled = conn.execute(
+            "SELECT count FROM card_due_days WHERE user_id = ? AND day = ''", (user_id,)
+        ).fetchone()
+        overdue = conn.execute(
+            "SELECT COALESCE(SUM(count), 0) AS c FROM card_due_days WHERE user_id = ? AND day > '' AND day < ?",
+            (user_id, today.isoformat()),
+        ).fetchone()
+        upcoming = {
+            r["day"]: r["count"]
+            for r in conn.execute(
+                "SELECT day, count FROM card_due_days WHERE user_id = ? AND day BETWEEN ? AND ?",
+                (user_id, today.isoformat(), horizon.isoformat()),
+            )
+        }
+    forecast = []
+    for offset in range(days):
+        day = (today + timedelta(days=offset)).isoformat()
+        forecast.append({"date": day, "count": upcoming.get(day, 0)})
+    return {
+        "total": sum(by_status.values()),
+        "byStatus": by_status,
+        "unscheduled": unscheduled["count"] if unscheduled else 0,
+        "overdue": overdue["c"],
+        "forecast": forecast,
+    }
+
+
+def score_sentences(conn: sqlite3.Connection, sentence_ids: list[str]) -> int:
+    import numpy as np
+
+    lexicon = german_lexicon()
+    scored = 0
+    for start in range(0, len(sentence_ids), SCORE_RESCORE_BATCH):
+        chunk = sentence_ids[start:start + SCORE_RESCORE_BATCH]
+        marks = ", ".join("?" for _ in chunk)
+        rows = conn.execute(f"SELECT id, text_de FROM sentences WHERE id IN ({marks})", chunk).fetchall()
+        if rows:
+            rarities: list[float] = []
+            offsets = []
+            lengths = []
+            for r in rows:
+                tokens = WORD_RE.findall(r["text_de"]) or [""]
+                offsets.append(len(rarities))
+                lengths.append(len(tokens))
+                rarities.extend(lexicon.rarity(t) for t in tokens)
+            length = np.asarray(lengths, dtype=np.float32)
+            rarity = np.add.reduceat(np.asarray(rarities, dtype=np.float32), offsets) / length
+            difficulty = np.clip(0.7 * rarity + 0.3 * np.minimum(length / 25, 1), 0, 1)
+            level = np.clip((difficulty * 6).astype(np.int32) + 1, 1, 6)
+            score = 1 - rarity
+            conn.executemany(
+                "UPDATE sentences SET difficulty = ?, level = ?, score = ? WHERE id = ?",
+                [
+                    (round(float(d), 4), int(lv), round(float(sc), 4), r["id"])
+                    for r, d, lv, sc in zip(rows, difficulty, level, score)
+                ],
+            )
+            scored += len(rows)
+        conn.execute(f"DELETE FROM score_dirty WHERE sentence_id IN ({marks})", chunk)
+    return scored
+
+
+def rescore_dirty(limit: int) -> int:
+    with get_db() as conn:
+        ids = [
+            r["sentence_id"]
+            for r in conn.execute("SELECT sentence_id FROM score_dirty LIMIT ?", (limit,))
+        ]
+        if not ids:
+            return 0
+        scored = score_sentences(conn, ids)
+        conn.commit()
+    return scored
+
+
+def drain_score_dirty() -> int:
+    rescored = 0
+    while True:
+        batch = rescore_dirty(SCORE_RESCORE_BATCH)
+        if not batch:
+            return rescored
+        rescored += batch
+
+
+rescore_job = None
+rescore_job_lock = threading.Lock()
+
+
+def schedule_rescore() -> None:
+    global rescore_job
+    with rescore_job_lock:
+        if rescore_job is None or rescore_job.done():
+            rescore_job = db_executor.submit("job", drain_score_dirty)
+
+
+def fetch_recommended(user_id: str, level: Optional[int]) -> list[sqlite3.Row]:
+    with get_db() as conn:
+        if conn.execute("SELECT 1 FROM score_dirty LIMIT 1").fetchone():
+            schedule_rescore()
+        if level is None:
+            ids = [
+                r["id"]
+                for r in conn.execute(
+                    "SELECT id FROM sentences WHERE score IS NOT NULL ORDER BY score DESC LIMIT ?", (SCORE_CANDIDATES,)
+                )
+            ]
+        else:
+            ids = [
+                r["id"]
+                for candidate_level in range(level, min(level + 2, 6) + 1)
+                for r in conn.execute(
+                    "SELECT id FROM sentences WHERE level = ? ORDER BY score DESC LIMIT ?",
+                    (candidate_level, SCORE_CANDIDATES),
+                )
+            ]
+        if not ids:
+            return []
+        rows = conn.execute(
+            f"""
+            SELECT s.id, s.text_de, s.text_ja, s.tags_json, s.difficulty, s.score,
+                   COUNT(l.id) AS total, COUNT(k.front) AS known
+            FROM sentences s
+            LEFT JOIN lexemes l ON l.sentence_id = s.id
+            LEFT JOIN (
+                SELECT DISTINCT front FROM cards WHERE user_id = ? AND status = 'learned'
+            ) k ON k.front = l.text_de
+            WHERE s.id IN ({", ".join("?" for _ in ids)})
+            GROUP BY s.id
+            """,
+            [user_id, *ids],
+        ).fetchall()
+    ranked = []
+    for r in rows:
+        total, known = r["total"], r["known"]
+        effective = min(max(r["difficulty"] - 0.3 * known / max(total, 1), 0.0), 1.0)
+        if level is not None and min(int(effective * 6) + 1, 6) != level:
+            continue
+        unknown_ratio = (total - known) / max(total, 1)
+        learnable = 1 - abs(unknown_ratio - 0.5) if total > known else 0.2
+        ranked.append((0.5 * learnable + 0.5 * r["score"], r["id"], r))
+    ranked.sort(key=lambda item: (-item[0], item[1]))
+    return [r for _, _, r in ranked[:50]]
+
+
+def parse_level(level: Optional[str]) -> Optional[int]:
+    if level is None or level == "":
+        return None
+    value = level.strip().upper()
+    if value in CEFR_LEVELS:
+        return CEFR_LEVELS.index(value) + 1
+    if value.isdigit() and 1 <= int(value) <= len(CEFR_LEVELS):
+        return int(value)
+    raise HTTPException(status_code=400, detail="level must be A1-C2 or 1-6")
+
+
+def fetch_cards(user_id: str, status: Optional[str]) -> list[dict]:
+    with get_db() as conn:
+        if status:
+            rows = conn.execute(
+                "SELECT id, front, back, status, due_at FROM cards WHERE user_id = ? AND status = ?",
+                (user_id, status),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT id, front, back, status, due_at FROM cards WHERE user_id = ?", (user_id,)
+            ).fetchall()
+    return [
+        {
+            "id": r["id"],
+            "front": r["front"],
+            "back": r["back"],
+            "status": r["status"],
+            "dueAt": r["due_at"],
+        }
+        for r in rows
+    ]
+
+
+def fetch_review_session(user_id: str, limit: int) -> list[dict]:
+    with get_db() as conn:
+        rows = conn.execute(
+            """
+            SELECT
+                c.id, c.front, c.back, c.status, c.due_at,
+                l.id AS lexeme_id, l.sentence_id AS lexeme_sentence_id, l.text_de AS lexeme_text_de,
+                l.meaning_ja, l.gender, l.etymology, l.preposition_pattern, l.verb_forms,
+                s.id AS sentence_id, s.text_de AS sentence_text_de, s.text_ja, s.tags_json
+            FROM cards c
+            LEFT JOIN lexemes l ON l.id = c.lexeme_id
+            LEFT JOIN sentences s ON s.id = l.sentence_id
+            WHERE c.user_id = ? AND c.status != 'learned' AND (c.due_at IS NULL OR c.due_at <= ?)
+            ORDER BY c.due_at IS NULL, c.due_at, c.created_at
+            LIMIT ?
+            """,
+            (user_id, iso(datetime.now(timezone.utc)), limit),
+        ).fetchall()
+    mock_sentences = {s["id"]: s for s in sentences}
+    items = []
+    for r in rows:
+        item: dict = {
+            "card": {
+                "id": r["id"],
+                "front": r["front"],
+                "back": r["back"],
+                "status": r["status"],
+                "dueAt": r["due_at"],
+            },
+            "lexeme": None,
+            "sentence": None,
+        }
+        if r["lexeme_id"]:
+            item["lexeme"] = {
+                "id": r["lexeme_id"],
+                "textDe": r["lexeme_text_de"],
+                "meaningJa": r["meaning_ja"],
+                "gender": r["gender"],
+                "etymology": r["etymology"],
+                "prepositionPattern": r["preposition_pattern"],
+                "verbForms": r["verb_forms"],
+            }
+        if r["sentence_id"]:
+            try:
+                tags = json.loads(r["tags_json"])
+            except Exception:
+                tags = []
+            item["sentence"] = {
+                "id": r["sentence_id"],
+                "textDe": r["sentence_text_de"],
+                "textJa": r["text_ja"],
+                "tags": tags,
+            }
+        elif r["lexeme_sentence_id"] in mock_sentences:
+            mock = mock_sentences[r["lexeme_sentence_id"]]
+            item["sentence"] = {
+                "id": mock["id"],
+                "textDe": mock["textDe"],
+                "textJa": mock["textJa"],
+                "tags": mock.get("tags", []),
+            }
+        items.append(item)
+    return items
+
+
+def backfill_translations(limit: int = 20, tm_stats: Optional[dict] = None) -> int:
+    with get_db() as conn:
+        rows = conn.execute(
+            """
+            SELECT id, text_de FROM sentences
+            WHERE text_ja IN ('(未翻訳)', '(自動生成予定)')
+            ORDER BY created_at DESC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+        if not rows:
+            return 0
+        for row in rows:
+            translated = translate_with_memory(row["text_de"], tm_stats)
+            conn.execute(
+                "UPDATE sentences SET text_ja = ? WHERE id = ?",
+                (translated, row["id"]),
+            )
+            conn.commit()
+        return len(rows)
+
+
+
+def x_headers() -> dict[str, str]:
+    if not X_BEARER_TOKEN:
+        raise HTTPException(status_code=501, detail="X_BEARER_TOKEN is not set")
+    return {"Authorization": f"Bearer {X_BEARER_TOKEN}"}
+
+
+class XClient:
+    def __init__(self, base_url: str) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.client: Optional[httpx.AsyncClient] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.limits: dict[str, tuple[int, float]] = {}
+        self.locks: dict[str, asyncio.Lock] = {}
+
+    def http(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self.client is None or self.client.is_closed or self.loop is not loop:
+            import httpx
+
+            self.client = httpx.AsyncClient(base_url=self.base_url, timeout=10)
+            self.locks = {}
+            self.loop = loop
+        return self.client
+
+    async def aclose(self) -> None:
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def record_limits(self, bucket: str, res: httpx.Response) -> None:
+        remaining = res.headers.get("x-rate-limit-remaining")
+        reset = res.headers.get("x-rate-limit-reset")
+        if res.status_code == 429:
+            remaining = "0"
+            reset = reset or str(time.time() + 60)
+        if remaining is not None and reset is not None:
+            self.limits[bucket] = (int(remaining), float(reset))
+
+    async def wait_for_window(self, bucket: str) -> None:
+        remaining, reset_at = self.limits.get(bucket, (1, 0.0))
+        delay = reset_at - time.time()
+        if remaining > 0 or delay <= 0:
+            return
+        if delay > X_RATE_LIMIT_MAX_WAIT:
+            raise HTTPException(status_code=429, detail=f"X rate limit for {bucket} resets in {int(delay)}s")
+        await asyncio.sleep(delay)
+
+    async def get(self, bucket: str, path: str, params: Optional[dict] = None) -> dict:
+        self.http()
+        async with self.locks.setdefault(bucket, asyncio.Lock()):
+            for attempt in range(2):
+                await self.wait_for_window(bucket)
+                res = await self.http().get(path, params=params, headers=x_headers())
+                self.record_limits(bucket, res)
+                if res.status_code == 429 and attempt == 0:
+                    continue
+                res.raise_for_status()
+                return res.json()
+        raise HTTPException(status_code=429, detail=f"X rate limit for {bucket}")
+
+    async def lookup_user_id(self, username: str) -> str:
+        body = await self.get("users/by/username", f"/users/by/username/{username}")
+        data = body.get("data")
+        if not data or "id" not in data:
+            raise HTTPException(status_code=404, detail=f"User {username} not found")
+        return data["id"]
+
+    async def fetch_user_posts(self, user_id: str, since_id: Optional[str]) -> tuple[list[dict], Optional[str]]:
+        params = {
+            "max_results": X_MAX_RESULTS,
+            "tweet.fields": "lang,created_at",
+            "exclude": "retweets,replies",
+        }
+        if since_id:
+            params["since_id"] = since_id
+        posts: list[dict] = []
+        newest_id = None
+        while True:
+            body = await self.get("users/tweets", f"/users/{user_id}/tweets", params=params)
+            meta = body.get("meta", {})
+            posts.extend(body.get("data", []))
+            newest_id = newest_id or meta.get("newest_id")
+            if not meta.get("next_token"):
+                return posts, newest_id
+            params["pagination_token"] = meta["next_token"]
+
+
+x_client = XClient(X_BASE_URL)
+
+
+def load_x_user_id(username: str) -> Optional[str]:
+    if username in user_id_cache:
+        return user_id_cache[username]
+    with get_db() as conn:
+        row = conn.execute("SELECT user_id FROM x_user_ids WHERE handle = ?", (username,)).fetchone()
+    if row:
+        user_id_cache[username] = row["user_id"]
+        return row["user_id"]
+    return None
+
+
+def save_x_user_id(username: str, user_id: str) -> None:
+    with get_db() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO x_user_ids (handle, user_id, resolved_at) VALUES (?, ?, ?)",
+            (username, user_id, iso(datetime.now(timezone.utc))),
+        )
+        conn.commit()
+    user_id_cache[username] = user_id
+
+
+def load_x_since_id(source_id: str) -> Optional[str]:
+    with get_db() as conn:
+        row = conn.execute("SELECT since_id FROM x_sync_state WHERE source_id = ?", (source_id,)).fetchone()
+    return row["since_id"] if row else None
+
+
+def save_x_since_id(source_id: str, since_id: str) -> None:
+    with get_db() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO x_sync_state (source_id, since_id, updated_at) VALUES (?, ?, ?)",
+            (source_id, since_id, iso(datetime.now(timezone.utc))),
+        )
+        conn.commit()
+
+
+def fetch_x_source_posts(src: dict) -> tuple[list[dict], Optional[str]]:
+    handle = src["handle"]
+    user_id = load_x_user_id(handle)
+    if not user_id:
+        user_id = from_thread.run(x_client.lookup_user_id, handle)
+        save_x_user_id(handle, user_id)
+    return from_thread.run(x_client.fetch_user_posts, user_id, load_x_since_id(src["id"]))
+
+
+def strip_html(text: str) -> str:
+    text = re.sub(r"<[^>]+>", "", text or "")
+    return re.sub(r"\s+", " ", text).strip()
+
+
+ABBREVIATIONS_BASE = {
+    "z.B.",
+    "u.a.",
+    "bzw.",
+    "ggf.",
+    "ca.",
+    "Nr.",
+    "Dr.",
+    "Prof.",
+    "d.h.",
+    "u.U.",
+    "S.",
+    "St.",
+}
+
+
+def load_abbreviations() -> set[str]:
+    extra = {abbr.strip() for abbr in load_setting("abbreviations") if abbr.strip()}
+    return ABBREVIATIONS_BASE | extra
+
+
+def protect_abbrev(text: str, abbreviations: Optional[set[str]] = None) -> str:
+    protected = text
+    for abbr in abbreviations if abbreviations is not None else load_abbreviations():
+        protected = protected.replace(abbr, abbr.replace(".", "§"))
+    return protected
+
+
+def unprotect_abbrev(text: str) -> str:
+    return text.replace("§", ".")
+
+
+def split_sentences(text: str, abbreviations: Optional[set[str]] = None) -> list[str]:
+    if not text:
+        return []
+    protected = protect_abbrev(text, abbreviations)
+    parts = re.split(r"(?<=[.!?])\s+", protected)
+    return [unprotect_abbrev(p.strip()) for p in parts if p.strip()]
+
+
+def clamp_sentences(text: str, max_sentences: int = 2) -> str:
+    return " ".join(split_sentences(text)[:max_sentences])
+
+
+def feed_archive_path(digest: str) -> str:
+    return os.path.join(FEED_ARCHIVE_DIR, digest[:2], f"{digest}.gz")
+
+
+def archive_feed_body(rss_url: str, source_handle: Optional[str], content: bytes) -> Optional[str]:
+    if not FEED_ARCHIVE_ENABLED or not content:
+        return None
+    digest = hashlib.sha256(content).hexdigest()
+    path = feed_archive_path(digest)
+    now = iso(datetime.now(timezone.utc))
+    try:
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{uuid4().hex}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(gzip.compress(content, compresslevel=6, mtime=0))
+            os.replace(tmp_path, path)
+        with get_db() as conn:
+            conn.execute(
+                """
+                INSERT INTO feed_archive (
+                    sha256, source_handle, rss_url, raw_size, stored_size,
+                    fetch_count, first_fetched_at, last_fetched_at
+                )
+                VALUES (?, ?, ?, ?, ?, 1, ?, ?)
+                ON CONFLICT(sha256) DO UPDATE SET
+                    fetch_count = fetch_count + 1,
+                    last_fetched_at = excluded.last_fetched_at
+                """,
+                (digest, source_handle, rss_url, len(content), os.path.getsize(path), now, now),
+            )
+            conn.commit()
+    except OSError:
+        return None
+    return digest
+
+
+def prune_feed_archive() -> dict:
+    cutoff = iso(datetime.now(timezone.utc) - timedelta(days=FEED_ARCHIVE_MAX_AGE_DAYS))
+    with get_db() as conn:
+        expired = [
+            r["sha256"]
+            for r in conn.execute("SELECT sha256 FROM feed_archive WHERE last_fetched_at < ?", (cutoff,))
+        ]
+        total = conn.execute(
+            "SELECT COALESCE(SUM(stored_size), 0) AS s FROM feed_archive WHERE last_fetched_at >= ?",
+            (cutoff,),
+        ).fetchone()["s"]
+        if total > FEED_ARCHIVE_MAX_BYTES:
+            for r in conn.execute(
+                """
+                SELECT sha256, stored_size FROM feed_archive
+                WHERE last_fetched_at >= ? ORDER BY last_fetched_at ASC
+                """,
+                (cutoff,),
+            ).fetchall():
+                if total <= FEED_ARCHIVE_MAX_BYTES:
+                    break
+                expired.append(r["sha256"])
+                total -= r["stored_size"]
+        conn.executemany("DELETE FROM feed_archive WHERE sha256 = ?", [(d,) for d in expired])
+        conn.commit()
+    for digest in expired:
+        try:
+            os.remove(feed_archive_path(digest))
+        except FileNotFoundError:
+            pass
+    return {"removed": len(expired), "storedBytes": total}
+
+
+def load_archived_feed(digest: str) -> bytes:
+    with open(feed_archive_path(digest), "rb") as f:
+        return gzip.decompress(f.read())
+
+
+def parse_rss_posts(content: bytes) -> list[dict]:
+    import feedparser
+
+    feed = feedparser.parse(content)
+    items = []
+    for entry in feed.entries[:5]:
+        title = strip_html(getattr(entry, "title", ""))
+        summary = strip_html(getattr(entry, "summary", ""))
+        raw = title if not summary else f"{title}. {summary}"
+        text = clamp_sentences(raw, max_sentences=2)
+        if DEBUG_RSS:
+            print("RAW:", raw)
+            print("CLAMPED:", text)
+        if text:
+            items.append({"text": text})
+    return items
+
+
+def fetch_rss_posts(rss_url: str, source_handle: Optional[str] = None) -> list[dict]:
+    try:
+        res = shared_http.call("GET", rss_url, follow_redirects=True, timeout=10)
+        res.raise_for_status()
+    except Exception:
+        return []
+    archive_feed_body(rss_url, source_handle, res.content)
+    return parse_rss_posts(res.content)
+
+
+def replay_feed_archive(
+    source_handle: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> dict:
+    query = "SELECT sha256, source_handle FROM feed_archive WHERE 1 = 1"
+    params: list = []
+    if source_handle:
+        query += " AND source_handle = ?"
+        params.append(source_handle)
+    if since:
+        query += " AND first_fetched_at >= ?"
+        params.append(since)
+    query += " ORDER BY first_fetched_at ASC, sha256 ASC"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    with get_db() as conn:
+        rows = conn.execute(query, params).fetchall()
+    bodies = 0
+    posts = 0
+    stored = 0
+    missing = 0
+    tm_stats = new_tm_stats()
+    started = time.perf_counter()
+    with llm_disabled():
+        for r in rows:
+            try:
+                content = load_archived_feed(r["sha256"])
+            except OSError:
+                missing += 1
+                continue
+            bodies += 1
+            for post in parse_rss_posts(content):
+                text = post.get("text", "").strip()
+                if not text:
+                    continue
+                posts += 1
+                _, inserted = store_sentence(text, r["source_handle"] or "rss", tm_stats)
+                if inserted:
+                    stored += 1
+    elapsed = time.perf_counter() - started
+    return {
+        "bodies": bodies,
+        "missing": missing,
+        "posts": posts,
+        "stored": stored,
+        "seconds": round(elapsed, 3),
+        "postsPerSecond": round(posts / elapsed, 1) if elapsed > 0 else 0.0,
+        "translationMemory": tm_stats_summary(tm_stats),
+    }
+
+
+async def preview_rss(rss_url: str) -> SourcePreviewDTO:
+    if not rss_url.startswith("http"):
+        raise HTTPException(status_code=400, detail="Invalid rssUrl")
+    try:
+        res = await shared_http.request("GET", rss_url, follow_redirects=True, timeout=10)
+        res.raise_for_status()
+    except Exception:
+        return SourcePreviewDTO(ok=False)
+    return await db_executor.run("job", parse_rss_preview, res.content)
+
+
+def parse_rss_preview(content: bytes) -> SourcePreviewDTO:
+    import feedparser
+
+    feed = feedparser.parse(content)
+    title = getattr(feed.feed, "title", None)
+    items = []
+    for entry in feed.entries[:5]:
+        title_raw = strip_html(getattr(entry, "title", ""))
+        summary_raw = strip_html(getattr(entry, "summary", ""))
+        raw = title_raw if not summary_raw else f"{title_raw}. {summary_raw}"
+        text = clamp_sentences(raw, max_sentences=2)
+        if text:
+            items.append(text)
+    return SourcePreviewDTO(ok=bool(items), title=title, items=items)
+
+
+def list_sources() -> list[dict]:
+    with get_db() as conn:
+        rows = conn.execute(
+            "SELECT id, handle, type, rss_url, enabled, last_sync_at FROM sources ORDER BY created_at DESC"
+        ).fetchall()
+    return [
+        {
+            "id": r["id"],
+            "handle": r["handle"],
+            "type": r["type"],
+            "rss_url": r["rss_url"],
+            "enabled": bool(r["enabled"]),
+            "lastSyncAt": r["last_sync_at"],
+        }
+        for r in rows
+    ]
+
+
+# ------------------------
+# Embeddings
+# ------------------------
+
+def embedding_cache_key(text: str) -> str:
+    return hashlib.sha256(f"{OLLAMA_EMBED_MODEL}\n{text}".encode("utf-8")).hexdigest()
+
+
+def request_embeddings(texts: list[str]) -> list[list[float]]:
+    with llm_scheduler.slot(llm_priority.get()):
+        res = shared_http.call(
+            "POST",
+            f"{OLLAMA_BASE_URL}/api/embed",
+            json={"model": OLLAMA_EMBED_MODEL, "input": texts},
+            timeout=120,
+        )
+    res.raise_for_status()
+    embeddings = res.json().get("embeddings") or []
+    if len(embeddings) != len(texts):
+        raise ValueError("Embedding count mismatch")
+    return embeddings
+
+
+def embed_texts(texts: list[str]) -> list[bytes]:
+    import numpy as np
+
+    keys = [embedding_cache_key(t) for t in texts]
+    with get_db() as conn:
+        cached = {
+            r["key"]: r["vector"]
+            for r in conn.execute(
+                f"SELECT key, vector FROM embedding_cache WHERE key IN ({', '.join('?' for _ in keys)})",
+                keys,
+            )
+        }
+    missing = [i for i, key in enumerate(keys) if key not in cached]
+    if missing:
+        fresh = request_embeddings([texts[i] for i in missing])
+        rows = []
+        for i, values in zip(missing, fresh):
+            vector = np.asarray(values, dtype=np.float32)
+            if EMBED_DIM:
+                vector = vector[:EMBED_DIM]
+            norm = float(np.linalg.norm(vector))
+            if norm > 0:
+                vector = vector / norm
+            cached[keys[i]] = vector.astype(np.float32).tobytes()
+            rows.append((keys[i], cached[keys[i]]))
+        with get_db() as conn:
+            conn.executemany("INSERT OR REPLACE INTO embedding_cache (key, vector) VALUES (?, ?)", rows)
+            conn.commit()
+    return [cached[key] for key in keys]
+
+
+class EmbeddingIndex:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.dim = 0
+        self.sentence_ids: list[str] = []
+        self.rows: dict[str, int] = {}
+        self.matrix: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+        self.assign: Optional[np.ndarray] = None
+        self.order: Optional[np.ndarray] = None
+        self.offsets: Optional[np.ndarray] = None
+        self.trained_rows = 0
+        self.training = False
+
+    def append(self, items: list[tuple[str, bytes]]) -> int:
+        if not items:
+            return 0
+        dim = len(items[0][1]) // 4
+        with get_db() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            meta = conn.execute("SELECT model, dim FROM embedding_meta WHERE id = 1").fetchone()
+            if meta is None:
+                conn.execute(
+                    "INSERT INTO embedding_meta (id, model, dim) VALUES (1, ?, ?)", (OLLAMA_EMBED_MODEL, dim)
+                )
+            elif meta["dim"] != dim or meta["model"] != OLLAMA_EMBED_MODEL:
+                raise ValueError("Embedding model changed; rebuild the index")
+            known = {
+                r["sentence_id"]
+                for r in conn.execute(
+                    f"SELECT sentence_id FROM embedding_rows WHERE sentence_id IN ({', '.join('?' for _ in items)})",
+                    [sentence_id for sentence_id, _ in items],
+                )
+            }
+            items = [(sentence_id, vector) for sentence_id, vector in dict(items).items() if sentence_id not in known]
+            if not items:
+                return 0
+            next_row = conn.execute("SELECT COALESCE(MAX(row), -1) + 1 AS r FROM embedding_rows").fetchone()["r"]
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "r+b" if os.path.exists(self.path) else "w+b") as f:
+                f.seek(next_row * dim * 4)
+                f.write(b"".join(vector for _, vector in items))
+                f.flush()
+                os.fsync(f.fileno())
+            conn.executemany(
+                "INSERT INTO embedding_rows (row, sentence_id) VALUES (?, ?)",
+                [(next_row + i, sentence_id) for i, (sentence_id, _) in enumerate(items)],
+            )
+            conn.commit()
+        return len(items)
+
+    def refresh(self) -> None:
+        import numpy as np
+
+        with get_db() as conn:
+            meta = conn.execute("SELECT dim FROM embedding_meta WHERE id = 1").fetchone()
+            count = conn.execute("SELECT COALESCE(MAX(row), -1) + 1 AS c FROM embedding_rows").fetchone()["c"]
+            if meta is None or count == len(self.sentence_ids):
+                return
+            if meta["dim"] != self.dim or count < len(self.sentence_ids):
+                self.dim = meta["dim"]
+                self.sentence_ids = []
+                self.rows = {}
+                self.centroids = self.assign = self.order = self.offsets = None
+                self.trained_rows = 0
+                self.load_clusters()
+            for r in conn.execute(
+                "SELECT row, sentence_id FROM embedding_rows WHERE row >= ? ORDER BY row",
+                (len(self.sentence_ids),),
+            ):
+                self.rows[r["sentence_id"]] = r["row"]
+                self.sentence_ids.append(r["sentence_id"])
+        self.matrix = np.memmap(self.path, dtype=np.float32, mode="r", shape=(len(self.sentence_ids), self.dim))
+        if self.centroids is not None and len(self.sentence_ids) - len(self.assign) >= EMBED_IVF_TAIL_MAX:
+            self.assign_tail()
+        needs_training = len(self.sentence_ids) >= EMBED_IVF_MIN_ROWS and (
+            self.centroids is None or len(self.sentence_ids) >= 4 * self.trained_rows
+        )
+        if needs_training and not self.training:
+            self.training = True
+            threading.Thread(target=self.train, name="embedding-ivf", daemon=True).start()
+
+    def clusters_path(self) -> str:
+        return f"{self.path}.ivf.npz"
+
+    def load_clusters(self) -> None:
+        import numpy as np
+
+        try:
+            with np.load(self.clusters_path()) as data:
+                centroids, assign, trained_rows = data["centroids"], data["assign"], int(data["trained_rows"])
+        except (OSError, KeyError, ValueError):
+            return
+        if centroids.shape[1] == self.dim:
+            self.set_clusters(centroids, assign)
+            self.trained_rows = trained_rows
+
+    def set_clusters(self, centroids: np.ndarray, assign: np.ndarray) -> None:
+        import numpy as np
+
+        self.centroids = centroids
+        self.assign = assign
+        self.order = np.argsort(assign, kind="stable").astype(np.int32)
+        self.offsets = np.searchsorted(assign[self.order], np.arange(len(centroids) + 1))
+
+    def nearest_centroids(self, matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        import numpy as np
+
+        out = np.empty(len(matrix), dtype=np.int32)
+        for start in range(0, len(matrix), 16384):
+            out[start:start + 16384] = np.argmax(matrix[start:start + 16384] @ centroids.T, axis=1)
+        return out
+
+    def assign_tail(self) -> None:
+        import numpy as np
+
+        tail = self.nearest_centroids(self.matrix[len(self.assign):], self.centroids)
+        self.set_clusters(self.centroids, np.concatenate([self.assign, tail]))
+        self.save_clusters()
+
+    def save_clusters(self) -> None:
+        import numpy as np
+
+        tmp_path = f"{self.clusters_path()}.{uuid4().hex}.npz"
+        np.savez(tmp_path, centroids=self.centroids, assign=self.assign, trained_rows=self.trained_rows)
+        os.replace(tmp_path, self.clusters_path())
+
+    def train(self) -> None:
+        import numpy as np
+
+        try:
+            with self.lock:
+                matrix = self.matrix
+            size = len(matrix)
+            lists = max(16, int(np.sqrt(size)))
+            rng = np.random.default_rng(size)
+            sample = np.asarray(matrix[np.sort(rng.choice(size, min(size, lists * 40), replace=False))])
+            centroids = sample[rng.choice(len(sample), lists, replace=False)].copy()
+            for _ in range(8):
+                nearest = self.nearest_centroids(sample, centroids)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, nearest, sample)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                filled = norms[:, 0] > 0
+                centroids[filled] = sums[filled] / norms[filled]
+            assign = self.nearest_centroids(matrix, centroids)
+            with self.lock:
+                if self.matrix is not None and self.matrix.shape[1] == centroids.shape[1]:
+                    self.set_clusters(centroids, assign)
+                    self.trained_rows = size
+                    self.save_clusters()
+        finally:
+            self.training = False
+
+    def candidates(self, vector: np.ndarray) -> Optional[np.ndarray]:
+        import numpy as np
+
+        if self.centroids is None:
+            return None
+        probes = min(EMBED_IVF_NPROBE, len(self.centroids))
+        lists = np.argpartition(-(self.centroids @ vector), probes - 1)[:probes]
+        parts = [self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists]
+        parts.append(np.arange(len(self.assign), len(self.sentence_ids), dtype=np.int32))
+        return np.sort(np.concatenate(parts))
+
+    def search(self, vector: np.ndarray, k: int, exclude: Optional[str] = None) -> list[tuple[str, float]]:
+        import numpy as np
+
+        with self.lock:
+            self.refresh()
+            matrix = self.matrix
+            sentence_ids = self.sentence_ids
+            rows = self.candidates(vector) if matrix is not None and vector.shape[0] == matrix.shape[1] else None
+        if matrix is None or not len(sentence_ids) or vector.shape[0] != matrix.shape[1]:
+            return []
+        if rows is None:
+            rows = np.arange(len(sentence_ids))
+            scores = matrix @ vector
+        else:
+            scores = matrix[rows] @ vector
+        if exclude is not None and exclude in self.rows:
+            scores[rows == self.rows[exclude]] = -np.inf
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(sentence_ids[rows[i]], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def vector_for(self, sentence_id: str) -> Optional[np.ndarray]:
+        with self.lock:
+            self.refresh()
+            row = self.rows.get(sentence_id)
+            matrix = self.matrix
+        if row is None or matrix is None:
+            return None
+        return matrix[row]
+
+
+embedding_index = EmbeddingIndex(EMBED_INDEX_PATH)
+
+
+def index_sentence_embeddings(items: list[tuple[str, str]]) -> int:
+    if not (EMBEDDINGS_ENABLED and llm_active()) or not items:
+        return 0
+    try:
+        vectors = embed_texts([text for _, text in items])
+        return embedding_index.append([(sentence_id, v) for (sentence_id, _), v in zip(items, vectors)])
+    except Exception:
+        return 0
+
+
+def similar_sentences(vector: np.ndarray, k: int, exclude: Optional[str] = None) -> list[dict]:
+    matches = embedding_index.search(vector, k * 2 + 5, exclude=exclude)
+    if not matches:
+        return []
+    with get_db() as conn:
+        rows = {
+            r["id"]: r
+            for r in conn.execute(
+                f"SELECT id, text_de, text_ja, tags_json FROM sentences WHERE id IN ({', '.join('?' for _ in matches)})",
+                [sentence_id for sentence_id, _ in matches],
+            )
+        }
+    items = []
+    for sentence_id, score in matches:
+        r = rows.get(sentence_id)
+        if r is None:
+            continue
+        try:
+            tags = json.loads(r["tags_json"])
+        except Exception:
+            tags = []
+        items.append({"id": r["id"], "textDe": r["text_de"], "textJa": r["text_ja"], "tags": tags, "score": score})
+        if len(items) >= k:
+            break
+    return items
+
+
+def backfill_embeddings(limit: int) -> int:
+    with get_db() as conn:
+        rows = conn.execute(
+            """
+            SELECT s.id, s.text_de FROM sentences s
+            LEFT JOIN embedding_rows e ON e.sentence_id = s.id
+            WHERE e.row IS NULL
+            ORDER BY s.created_at
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+    indexed = 0
+    for start in range(0, len(rows), 64):
+        indexed += index_sentence_embeddings([(r["id"], r["text_de"]) for r in rows[start:start + 64]])
+    return indexed
+
+
+# ------------------------
+# Snapshot and Delta Sync
+# ------------------------
+
+SNAPSHOT_SCHEMA = [
+    """
+    CREATE TABLE snap.sentences (
+        id TEXT PRIMARY KEY,
+        text_de TEXT NOT NULL,
+        text_ja TEXT NOT NULL,
+        tags_json TEXT NOT NULL,
+        source_handle TEXT,
+        created_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE snap.lexemes (
+        id TEXT PRIMARY KEY,
+        sentence_id TEXT NOT NULL,
+        text_de TEXT NOT NULL,
+        meaning_ja TEXT NOT NULL,
+        gender TEXT NOT NULL,
+        etymology TEXT NOT NULL,
+        preposition_pattern TEXT,
+        verb_forms TEXT,
+        created_at TEXT NOT NULL
+    )
+    """,
+    "CREATE TABLE snap.meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+]
+snapshot_lock = threading.Lock()
+
+
+def current_sync_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) AS v FROM change_log").fetchone()["v"]
+
+
+def build_snapshot() -> dict:
+    with snapshot_lock:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        tmp_db = os.path.join(SNAPSHOT_DIR, f"build-{uuid4().hex}.sqlite")
+        conn = get_db()
+        try:
+            conn.execute("ATTACH DATABASE ? AS snap", (tmp_db,))
+            conn.execute("BEGIN")
+            version = current_sync_version(conn)
+            for ddl in SNAPSHOT_SCHEMA:
+                conn.execute(ddl)
+            for table in ("sentences", "lexemes"):
+                columns = [r["name"] for r in conn.execute(f"PRAGMA snap.table_info({table})")]
+                column_list = ", ".join(columns)
+                conn.execute(f"INSERT INTO snap.{table} ({column_list}) SELECT {column_list} FROM main.{table}")
+            conn.execute("CREATE INDEX snap.idx_lexemes_sentence_id ON lexemes(sentence_id)")
+            generated_at = iso(datetime.now(timezone.utc))
+            conn.executemany(
+                "INSERT INTO snap.meta (key, value) VALUES (?, ?)",
+                [("version", str(version)), ("generatedAt", generated_at), ("schemaVersion", str(SCHEMA_VERSION))],
+            )
+            conn.commit()
+            conn.execute("DETACH DATABASE snap")
+        finally:
+            conn.close()
+        snap = sqlite3.connect(tmp_db)
+        snap.execute("VACUUM")
+        snap.close()
+        path = os.path.join(SNAPSHOT_DIR, f"snapshot-{version}.sqlite.gz")
+        digest = hashlib.sha256()
+        with open(tmp_db, "rb") as src, gzip.GzipFile(f"{path}.tmp", "wb", compresslevel=9, mtime=0) as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(tmp_db)
+        os.replace(f"{path}.tmp", path)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        snapshot = {
+            "version": version,
+            "path": path,
+            "size": os.path.getsize(path),
+            "sha256": digest.hexdigest(),
+            "createdAt": generated_at,
+        }
+        with get_db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (version, path, size, sha256, created_at) VALUES (?, ?, ?, ?, ?)",
+                (version, path, snapshot["size"], snapshot["sha256"], generated_at),
+            )
+            stale = conn.execute(
+                "SELECT version, path FROM snapshots ORDER BY version DESC LIMIT -1 OFFSET ?",
+                (SNAPSHOT_KEEP,),
+            ).fetchall()
+            conn.executemany("DELETE FROM snapshots WHERE version = ?", [(r["version"],) for r in stale])
+            conn.commit()
+        for r in stale:
+            if r["path"] != path and os.path.exists(r["path"]):
+                os.remove(r["path"])
+        return snapshot
+
+
+def latest_snapshot() -> Optional[dict]:
+    with get_db() as conn:
+        row = conn.execute(
+            "SELECT version, path, size, sha256, created_at FROM snapshots ORDER BY version DESC LIMIT 1"
+        ).fetchone()
+        version = current_sync_version(conn)
+    if not row or not os.path.exists(row["path"]):
+        return None
+    return {
+        "version": row["version"],
+        "path": row["path"],
+        "size": row["size"],
+        "sha256": row["sha256"],
+        "createdAt": row["created_at"],
+        "stale": version > row["version"]
+        and datetime.now(timezone.utc) - datetime.fromisoformat(row["created_at"])
+        > timedelta(seconds=SNAPSHOT_REFRESH_SECONDS),
+    }
+
+
+def refresh_snapshot_in_background() -> None:
+    if snapshot_lock.locked():
+        return
+
+    def run() -> None:
+        try:
+            build_snapshot()
+        except Exception:
+            pass
+
+    db_executor.submit("job", run)
+
+
+def fetch_snapshot_cards(user_id: str) -> dict:
+    with get_db() as conn:
+        conn.execute("BEGIN")
+        version = current_sync_version(conn)
+        rows = conn.execute(
+            "SELECT id, lexeme_id, front, back, status, due_at FROM cards WHERE user_id = ? ORDER BY created_at",
+            (user_id,),
+        ).fetchall()
+        conn.rollback()
+    return {
+        "version": version,
+        "cards": [
+            {
+                "id": r["id"],
+                "lexemeId": r["lexeme_id"],
+                "front": r["front"],
+                "back": r["back"],
+                "status": r["status"],
+                "dueAt": r["due_at"],
+            }
+            for r in rows
+        ],
+    }
+
+
+def fetch_sync_changes(user_id: str, since: int, limit: int) -> dict:
+    with get_db() as conn:
+        entries = conn.execute(
+            """
+            SELECT seq, entity, entity_id, op FROM change_log
+            WHERE seq > ? AND (user_id IS NULL OR user_id = ?)
+            ORDER BY seq LIMIT ?
+            """,
+            (since, user_id, limit + 1),
+        ).fetchall()
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        ids: dict[str, list[str]] = {"sentence": [], "lexeme": [], "card": []}
+        deleted = []
+        for e in entries:
+            if e["op"] == "delete":
+                deleted.append({"entity": e["entity"], "id": e["entity_id"]})
+            else:
+                ids[e["entity"]].append(e["entity_id"])
+
+        def select(query: str, keys: list[str], *extra: str) -> list[sqlite3.Row]:
+            if not keys:
+                return []
+            return conn.execute(query.format(", ".join("?" for _ in keys)), [*keys, *extra]).fetchall()
+
+        sentence_rows = select(
+            "SELECT id, text_de, text_ja, tags_json FROM sentences WHERE id IN ({})", ids["sentence"]
+        )
+        lexeme_rows = select(
+            """
+            SELECT id, sentence_id, text_de, meaning_ja, gender, etymology, preposition_pattern, verb_forms
+            FROM lexemes WHERE id IN ({})
+            """,
+            ids["lexeme"],
+        )
+        card_rows = select(
+            "SELECT id, lexeme_id, front, back, status, due_at FROM cards WHERE id IN ({}) AND user_id = ?",
+            ids["card"],
+            user_id,
+        )
+    sentences_out = []
+    for r in sentence_rows:
+        try:
+            tags = json.loads(r["tags_json"])
+        except Exception:
+            tags = []
+        sentences_out.append({"id": r["id"], "textDe": r["text_de"], "textJa": r["text_ja"], "tags": tags})
+    return {
+        "version": entries[-1]["seq"] if entries else since,
+        "hasMore": has_more,
+        "sentences": sentences_out,
+        "lexemes": [
+            {
+                "id": r["id"],
+                "sentenceId": r["sentence_id"],
+                "textDe": r["text_de"],
+                "meaningJa": r["meaning_ja"],
+                "gender": r["gender"],
+                "etymology": r["etymology"],
+                "prepositionPattern": r["preposition_pattern"],
+                "verbForms": r["verb_forms"],
+            }
+            for r in lexeme_rows
+        ],
+        "cards": [
+            {
+                "id": r["id"],
+                "lexemeId": r["lexeme_id"],
+                "front": r["front"],
+                "back": r["back"],
+                "status": r["status"],
+                "dueAt": r["due_at"],
+            }
+            for r in card_rows
+        ],
+        "deleted": deleted,
+    }
+
+
+# ------------------------
+# Retention and Archive
+# ------------------------
+
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS archive.sentences (
+        id TEXT PRIMARY KEY,
+        text_de TEXT NOT NULL,
+        text_ja TEXT NOT NULL,
+        tags_json TEXT NOT NULL,
+        source_handle TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        archived_at TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS archive.lexemes (
+        id TEXT PRIMARY KEY,
+        sentence_id TEXT NOT NULL,
+        text_de TEXT NOT NULL,
+        meaning_ja TEXT NOT NULL,
+        gender TEXT NOT NULL,
+        etymology TEXT NOT NULL,
+        preposition_pattern TEXT,
+        verb_forms TEXT,
+        created_at TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS archive.idx_sentences_source_created ON sentences(source_handle, created_at)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_sentences_text_de ON sentences(text_de)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_lexemes_sentence_id ON lexemes(sentence_id)",
+]
+retention_lock = threading.Lock()
+retention_worker_lock = threading.Lock()
+retention_worker: Optional[threading.Thread] = None
+
+
+def get_archive_db() -> sqlite3.Connection:
+    conn = sqlite3.connect(ARCHIVE_DB_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def retention_policies(conn: sqlite3.Connection) -> dict[str, dict]:
+    policies = {}
+    for r in conn.execute("SELECT handle FROM sources"):
+        policies[r["handle"]] = {"maxAgeDays": RETENTION_MAX_AGE_DAYS, "maxSentences": RETENTION_MAX_SENTENCES}
+    policies.setdefault("manual", {"maxAgeDays": None, "maxSentences": None})
+    for r in conn.execute("SELECT source_handle, max_age_days, max_sentences FROM retention_policies"):
+        policies[r["source_handle"]] = {"maxAgeDays": r["max_age_days"], "maxSentences": r["max_sentences"]}
+    return policies
+
+
+def expired_sentence_ids(conn: sqlite3.Connection, handle: str, policy: dict, now: datetime, limit: int) -> list[str]:
+    age_cutoff = iso(now - timedelta(days=policy["maxAgeDays"])) if policy["maxAgeDays"] is not None else ""
+    keep_newest = policy["maxSentences"] if policy["maxSentences"] is not None else -1
+    rows = conn.execute(
+        """
+        SELECT s.id FROM sentences s
+        WHERE s.source_handle = ?
+          AND (
+              s.created_at < ?
+              OR (? >= 0 AND s.id NOT IN (
+                  SELECT id FROM sentences WHERE source_handle = ?
+                  ORDER BY created_at DESC, id DESC LIMIT ?
+              ))
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM lexemes l JOIN cards c ON c.lexeme_id = l.id WHERE l.sentence_id = s.id
+          )
+        ORDER BY s.created_at
+        LIMIT ?
+        """,
+        (handle, age_cutoff, keep_newest, handle, keep_newest, limit),
+    ).fetchall()
+    return [r["id"] for r in rows]
+
+
+def archive_sentences(conn: sqlite3.Connection, ids: list[str], archived_at: str) -> None:
+    marks = ", ".join("?" for _ in ids)
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO archive.sentences
+            (id, text_de, text_ja, tags_json, source_handle, created_at, archived_at)
+        SELECT id, text_de, text_ja, tags_json, source_handle, created_at, ? FROM main.sentences
+        WHERE id IN ({marks})
+        """,
+        [archived_at, *ids],
+    )
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO archive.lexemes
+        SELECT id, sentence_id, text_de, meaning_ja, gender, etymology, preposition_pattern, verb_forms, created_at
+        FROM main.lexemes WHERE sentence_id IN ({marks})
+        """,
+        ids,
+    )
+    for r in conn.execute(
+        f"SELECT sentence_id, signature FROM main.sentence_minhash WHERE sentence_id IN ({marks})", ids
+    ).fetchall():
+        signature = array("I")
+        signature.frombytes(r["signature"])
+        conn.executemany(
+            "DELETE FROM main.minhash_bands WHERE band = ? AND bucket = ? AND sentence_id = ?",
+            [(band, bucket, r["sentence_id"]) for band, bucket in enumerate(minhash_buckets(signature))],
+        )
+    for table in ("sentence_minhash", "enrichment_jobs", "near_duplicates", "lexemes"):
+        conn.execute(f"DELETE FROM main.{table} WHERE sentence_id IN ({marks})", ids)
+    conn.execute(f"DELETE FROM main.sentences WHERE id IN ({marks})", ids)
+
+
+def incremental_vacuum(conn: sqlite3.Connection) -> int:
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    conn.execute(f"PRAGMA incremental_vacuum({RETENTION_VACUUM_PAGES})")
+    return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def run_retention(dry_run: bool = False) -> dict:
+    with retention_lock:
+        now = datetime.now(timezone.utc)
+        archived_at = iso(now)
+        report: dict[str, int] = {}
+        conn = get_db()
+        try:
+            if not dry_run:
+                conn.execute("ATTACH DATABASE ? AS archive", (ARCHIVE_DB_PATH,))
+                for ddl in ARCHIVE_SCHEMA:
+                    conn.execute(ddl)
+                conn.commit()
+            policies = retention_policies(conn)
+            handles = [r["source_handle"] for r in conn.execute("SELECT DISTINCT source_handle FROM sentences")]
+            for handle in handles:
+                policy = policies.get(handle, {"maxAgeDays": RETENTION_ORPHAN_MAX_AGE_DAYS or None, "maxSentences": None})
+                if policy["maxAgeDays"] is None and policy["maxSentences"] is None:
+                    continue
+                if dry_run:
+                    report[handle] = len(expired_sentence_ids(conn, handle, policy, now, -1))
+                    continue
+                while True:
+                    ids = expired_sentence_ids(conn, handle, policy, now, RETENTION_BATCH_SIZE)
+                    if not ids:
+                        break
+                    archive_sentences(conn, ids, archived_at)
+                    conn.commit()
+                    report[handle] = report.get(handle, 0) + len(ids)
+            freed = 0
+            if not dry_run:
+                conn.execute("DETACH DATABASE archive")
+                if report:
+                    freed = incremental_vacuum(conn)
+        finally:
+            conn.close()
+    return {
+        "dryRun": dry_run,
+        "archived": sum(report.values()),
+        "bySource": {handle: count for handle, count in report.items() if count},
+        "freedPages": freed,
+    }
+
+
+def run_retention_worker() -> None:
+    while True:
+        time.sleep(min(RETENTION_INTERVAL_SECONDS, 300))
+        now = datetime.now(timezone.utc)
+        try:
+            with get_db() as conn:
+                claimed = conn.execute(
+                    "UPDATE retention_state SET last_run_at = ? WHERE id = 1 AND last_run_at < ?",
+                    (iso(now), iso(now - timedelta(seconds=RETENTION_INTERVAL_SECONDS))),
+                ).rowcount
+                conn.commit()
+            if claimed:
+                run_retention()
+        except Exception:
+            pass
+
+
+def ensure_retention_worker() -> None:
+    global retention_worker
+    with retention_worker_lock:
+        if retention_worker is None or not retention_worker.is_alive():
+            retention_worker = threading.Thread(target=run_retention_worker, name="retention-worker", daemon=True)
+            retention_worker.start()
+
+
+def search_archive(q: Optional[str], source: Optional[str], limit: int) -> list[dict]:
+    if not os.path.exists(ARCHIVE_DB_PATH):
+        return []
+    query = "SELECT id, text_de, text_ja, tags_json FROM sentences WHERE 1 = 1"
+    params: list = []
+    if q:
+        query += " AND text_de LIKE ?"
+        params.append(f"%{q}%")
+    if source:
+        query += " AND source_handle = ?"
+        params.append(source)
+    query += " ORDER BY created_at DESC LIMIT ?"
+    params.append(limit)
+    with get_archive_db() as conn:
+        rows = conn.execute(query, params).fetchall()
+    items = []
+    for r in rows:
+        try:
+            tags = json.loads(r["tags_json"])
+        except Exception:
+            tags = []
+        items.append({"id": r["id"], "textDe": r["text_de"], "textJa": r["text_ja"], "tags": tags})
+    return items
+
+
+def fetch_archived_sentence(sentence_id: str) -> Optional[dict]:
+    if not os.path.exists(ARCHIVE_DB_PATH):
+        return None
+    with get_archive_db() as conn:
+        row = conn.execute(
+            "SELECT id, text_de, text_ja, tags_json FROM sentences WHERE id = ?", (sentence_id,)
+        ).fetchone()
+        if not row:
+            return None
+        lexemes = conn.execute(
+            """
+            SELECT id, text_de, meaning_ja, gender, etymology, preposition_pattern, verb_forms
+            FROM lexemes WHERE sentence_id = ? ORDER BY created_at
+            """,
+            (sentence_id,),
+        ).fetchall()
+    try:
+        tags = json.loads(row["tags_json"])
+    except Exception:
+        tags = []
+    return {
+        "sentence": {"id": row["id"], "textDe": row["text_de"], "textJa": row["text_ja"], "tags": tags},
+        "lexemes": [
+            {
+                "id": r["id"],
+                "textDe": r["text_de"],
+                "meaningJa": r["meaning_ja"],
+                "gender": r["gender"],
+                "etymology": r["etymology"],
+                "prepositionPattern": r["preposition_pattern"],
+                "verbForms": r["verb_forms"],
+            }
+            for r in lexemes
+        ],
+    }
+
+
+# ------------------------
+# Notification Planner
+# ------------------------
+
+push_logger = logging.getLogger("berlincoach.push")
+notification_wakeup = threading.Event()
+notification_worker_lock = threading.Lock()
+notification_worker: Optional[threading.Thread] = None
+
+
+def notification_slot_times(schedule: dict, start: datetime, hours: int) -> list[str]:
+    if not schedule.get("active") or int(schedule.get("maxSentences") or 0) <= 0:
+        return []
+    tz = ZoneInfo(NOTIFY_TIMEZONE)
+    end = start + timedelta(hours=hours)
+    interval = max(int(schedule.get("intervalMinutes") or 60), 1)
+    window_start = schedule["startHour"] * 60 + schedule.get("startMinute", 0)
+    window_end = schedule["endHour"] * 60 + schedule.get("endMinute", 0)
+    length = window_end - window_start if window_end >= window_start else window_end + 1440 - window_start
+    slots = set()
+    day = start.astimezone(tz).date() - timedelta(days=1)
+    while day <= end.astimezone(tz).date():
+        midnight = datetime(day.year, day.month, day.day, tzinfo=tz)
+        for offset in range(0, length + 1, interval):
+            slot = (midnight + timedelta(minutes=window_start + offset)).astimezone(timezone.utc)
+            if start <= slot < end:
+                slots.add(iso(slot))
+        day += timedelta(days=1)
+    return sorted(slots)
+
+
+def plan_notifications(now: Optional[datetime] = None) -> dict:
+    now = now or datetime.now(timezone.utc)
+    schedule = load_setting("schedule")
+    wanted = notification_slot_times(schedule, now, NOTIFY_HORIZON_HOURS)
+    per_slot = max(int(schedule.get("maxSentences") or 0), 0)
+    with get_db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        pending = conn.execute(
+            "SELECT id, slot_at, position FROM notification_slots WHERE status = 'pending' AND slot_at >= ?",
+            (iso(now),),
+        ).fetchall()
+        wanted_set = set(wanted)
+        stale = [r["id"] for r in pending if r["slot_at"] not in wanted_set or r["position"] >= per_slot]
+        conn.executemany("DELETE FROM notification_slots WHERE id = ?", [(i,) for i in stale])
+        stale_set = set(stale)
+        used: dict[str, set[int]] = {}
+        for r in pending:
+            if r["id"] not in stale_set:
+                used.setdefault(r["slot_at"], set()).add(r["position"])
+        free = [
+            (slot_at, position)
+            for slot_at in wanted
+            for position in range(per_slot)
+            if position not in used.get(slot_at, set())
+        ]
+        picked = []
+        if free:
+            picked = [
+                r["id"]
+                for r in conn.execute(
+                    """
+                    SELECT s.id FROM sentences s
+                    WHERE s.text_ja NOT IN ('(未翻訳)', '(自動生成予定)')
+                      AND NOT EXISTS (SELECT 1 FROM notification_slots n WHERE n.sentence_id = s.id)
+                    ORDER BY s.created_at DESC
+                    LIMIT ?
+                    """,
+                    (len(free),),
+                )
+            ]
+        conn.executemany(
+            "INSERT INTO notification_slots (slot_at, position, sentence_id) VALUES (?, ?, ?)",
+            [(slot_at, position, sentence_id) for (slot_at, position), sentence_id in zip(free, picked)],
+        )
+        conn.commit()
+    return {"slots": len(wanted), "added": len(picked), "removed": len(stale), "unfilled": len(free) - len(picked)}
+
+
+def notification_slots_from_rows(rows: list[sqlite3.Row]) -> list[NotificationSlotDTO]:
+    slots: dict[str, NotificationSlotDTO] = {}
+    for r in rows:
+        slot = slots.setdefault(r["slot_at"], NotificationSlotDTO(slotAt=r["slot_at"], status=r["status"], sentences=[]))
+        slot.sentences.append(
+            SentenceDTO(id=r["id"], textDe=r["text_de"], textJa=r["text_ja"], tags=json.loads(r["tags_json"]))
+        )
+    return list(slots.values())
+
+
+def next_notification(now: Optional[datetime] = None) -> Optional[NotificationSlotDTO]:
+    now = now or datetime.now(timezone.utc)
+    with get_db() as conn:
+        rows = conn.execute(
+            """
+            SELECT n.slot_at, n.status, s.id, s.text_de, s.text_ja, s.tags_json
+            FROM notification_slots n JOIN sentences s ON s.id = n.sentence_id
+            WHERE n.status = 'pending' AND n.slot_at = (
+                SELECT MIN(slot_at) FROM notification_slots WHERE status = 'pending' AND slot_at >= ?
             )
-        conn.commit()
-        return len(rows)
+            ORDER BY n.position
+            """,
+            (iso(now),),
+        ).fetchall()
+    slots = notification_slots_from_rows(rows)
+    return slots[0] if slots else None
 
 
-init_db()
+def notification_queue(hours: int, now: Optional[datetime] = None) -> list[NotificationSlotDTO]:
+    now = now or datetime.now(timezone.utc)
+    with get_db() as conn:
+        rows = conn.execute(
+            """
+            SELECT n.slot_at, n.status, s.id, s.text_de, s.text_ja, s.tags_json
+            FROM notification_slots n JOIN sentences s ON s.id = n.sentence_id
+            WHERE n.status = 'pending' AND n.slot_at >= ? AND n.slot_at < ?
+            ORDER BY n.slot_at, n.position
+            """,
+            (iso(now), iso(now + timedelta(hours=hours))),
+        ).fetchall()
+    return notification_slots_from_rows(rows)
 
 
-def x_headers() -> dict[str, str]:
-    if not X_BEARER_TOKEN:
-        raise HTTPException(status_code=501, detail="X_BEARER_TOKEN is not set")
-    return {"Authorization": f"Bearer {X_BEARER_TOKEN}"}
+def push_notification(slot_at: str, text_de: str, text_ja: str) -> None:
+    push_logger.info("push %s: %s / %s", slot_at, text_de, text_ja)
 
 
-def fetch_user_id(username: str) -> str:
-    if username in user_id_cache:
-        return user_id_cache[username]
-    url = f"{X_BASE_URL}/users/by/username/{username}"
-    with httpx.Client(timeout=10) as client:
-        res = client.get(url, headers=x_headers())
-        res.raise_for_status()
-        data = res.json().get("data")
-        if not data or "id" not in data:
-            raise HTTPException(status_code=404, detail=f"User {username} not found")
-        user_id_cache[username] = data["id"]
-        return data["id"]
+def send_due_notifications(now: Optional[datetime] = None) -> int:
+    now = now or datetime.now(timezone.utc)
+    interval = max(int(load_setting("schedule").get("intervalMinutes") or 60), 1)
+    expired_before = iso(now - timedelta(minutes=interval))
+    with get_db() as conn:
+        rows = conn.execute(
+            """
+            SELECT n.id, n.slot_at, s.text_de, s.text_ja
+            FROM notification_slots n JOIN sentences s ON s.id = n.sentence_id
+            WHERE n.status = 'pending' AND n.slot_at <= ?
+            ORDER BY n.slot_at, n.position
+            """,
+            (iso(now),),
+        ).fetchall()
+        sent = 0
+        for r in rows:
+            status = "expired" if r["slot_at"] < expired_before else "sent"
+            claimed = conn.execute(
+                "UPDATE notification_slots SET status = ?, sent_at = ? WHERE id = ? AND status = 'pending'",
+                (status, iso(now), r["id"]),
+            ).rowcount
+            conn.commit()
+            if claimed and status == "sent":
+                push_notification(r["slot_at"], r["text_de"], r["text_ja"])
+                sent += 1
+    return sent
 
 
-def fetch_user_posts(user_id: str) -> list[dict]:
-    url = f"{X_BASE_URL}/users/{user_id}/tweets"
-    params = {
-        "max_results": 5,
-        "tweet.fields": "lang,created_at",
-        "exclude": "retweets,replies",
-    }
-    with httpx.Client(timeout=10) as client:
-        res = client.get(url, headers=x_headers(), params=params)
-        res.raise_for_status()
-        return res.json().get("data", [])
+def run_notification_worker() -> None:
+    while True:
+        timeout = NOTIFY_TICK_SECONDS
+        try:
+            send_due_notifications()
+            plan_notifications()
+            upcoming = next_notification()
+            if upcoming:
+                until = datetime.fromisoformat(upcoming.slotAt) - datetime.now(timezone.utc)
+                timeout = min(timeout, max(until.total_seconds(), 0) + 1)
+        except Exception:
+            pass
+        notification_wakeup.wait(timeout)
+        notification_wakeup.clear()
 
 
-def strip_html(text: str) -> str:
-    text = re.sub(r"<[^>]+>", "", text or "")
-    return re.sub(r"\s+", " ", text).strip()
+def ensure_notification_worker() -> None:
+    global notification_worker
+    with notification_worker_lock:
+        if notification_worker is None or not notification_worker.is_alive():
+            notification_worker = threading.Thread(
+                target=run_notification_worker, name="notification-worker", daemon=True
+            )
+            notification_worker.start()
 
 
-ABBREVIATIONS_BASE = {
-    "z.B.",
-    "u.a.",
-    "bzw.",
-    "ggf.",
-    "ca.",
-    "Nr.",
-    "Dr.",
-    "Prof.",
-    "d.h.",
-    "u.U.",
-    "S.",
-    "St.",
-}
+# ------------------------
+# Users
+# ------------------------
 
+user_token_cache: OrderedDict[str, str] = OrderedDict()
+user_token_lock = threading.Lock()
 
-def load_abbreviations() -> set[str]:
-    extra = {abbr.strip() for abbr in abbreviations_extra if abbr.strip()}
-    return ABBREVIATIONS_BASE | extra
 
+def hash_user_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
-def protect_abbrev(text: str) -> str:
-    protected = text
-    for abbr in load_abbreviations():
-        protected = protected.replace(abbr, abbr.replace(".", "§"))
-    return protected
+
+def create_user(name: str) -> dict:
+    name = name.strip()
+    if not name:
+        raise HTTPException(status_code=400, detail="name is required")
+    token = secrets.token_urlsafe(32)
+    user = {"id": str(uuid4()), "name": name, "createdAt": iso(datetime.now(timezone.utc))}
+    with get_db() as conn:
+        try:
+            conn.execute(
+                "INSERT INTO users (id, name, token_hash, created_at) VALUES (?, ?, ?, ?)",
+                (user["id"], name, hash_user_token(token), user["createdAt"]),
+            )
+        except sqlite3.IntegrityError:
+            raise HTTPException(status_code=409, detail="User already exists")
+        conn.commit()
+    return {**user, "token": token}
+
+
+def current_user(request: Request) -> str:
+    auth = request.headers.get("authorization", "")
+    token = auth[7:].strip() if auth.lower().startswith("bearer ") else request.headers.get("x-user-token", "")
+    if not token:
+        if SINGLE_USER:
+            return DEFAULT_USER_ID
+        raise HTTPException(status_code=401, detail="Missing user token")
+    token_hash = hash_user_token(token)
+    with user_token_lock:
+        user_id = user_token_cache.get(token_hash)
+        if user_id is not None:
+            user_token_cache.move_to_end(token_hash)
+            return user_id
+    with get_db() as conn:
+        row = conn.execute("SELECT id FROM users WHERE token_hash = ?", (token_hash,)).fetchone()
+    if not row:
+        raise HTTPException(status_code=401, detail="Invalid user token")
+    with user_token_lock:
+        user_token_cache[token_hash] = row["id"]
+        if len(user_token_cache) > 10000:
+            user_token_cache.popitem(last=False)
+    return row["id"]
 
 
-def unprotect_abbrev(text: str) -> str:
-    return text.replace("§", ".")
+def fetch_review_log(user_id: str, limit: int) -> list[dict]:
+    with get_db() as conn:
+        rows = conn.execute(
+            """
+            SELECT card_id, rating, previous_status, reviewed_at FROM card_reviews
+            WHERE user_id = ? ORDER BY reviewed_at DESC LIMIT ?
+            """,
+            (user_id, limit),
+        ).fetchall()
+    return [
+        {
+            "cardId": r["card_id"],
+            "rating": r["rating"],
+            "previousStatus": r["previous_status"],
+            "reviewedAt": r["reviewed_at"],
+        }
+        for r in rows
+    ]
 
 
-def clamp_sentences(text: str, max_sentences: int = 2) -> str:
-    if not text:
-        return ""
-    protected = protect_abbrev(text)
-    parts = re.split(r"(?<=[.!?])\s+", protected)
-    parts = [unprotect_abbrev(p.strip()) for p in parts if p.strip()]
-    return " ".join(parts[:max_sentences])
+# ------------------------
+# Profiling
+# ------------------------
 
+def require_admin(request: Request) -> None:
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    require_admin_token(request)
+
+
+def require_admin_token(request: Request) -> None:
+    if ADMIN_TOKEN:
+        if not hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+            raise HTTPException(status_code=403, detail="Forbidden")
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1"):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.samples: Counter[str] = Counter()
+        self.sample_count = 0
+        self.started_at: Optional[str] = None
+        self.seconds = 0
+        self.interval = 0.0
+
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, seconds: int, interval: float) -> dict:
+        with self.lock:
+            if self.running():
+                raise HTTPException(status_code=409, detail="Profiler already running")
+            self.samples = Counter()
+            self.sample_count = 0
+            self.started_at = iso(datetime.now(timezone.utc))
+            self.seconds = seconds
+            self.interval = interval
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+            self.thread.start()
+        return self.status()
+
+    def stop(self) -> dict:
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        return self.status()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        deadline = time.monotonic() + self.seconds
+        while not self.stop_event.is_set() and time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+            self.stop_event.wait(self.interval)
+
+    def status(self) -> dict:
+        return {
+            "running": self.running(),
+            "startedAt": self.started_at,
+            "seconds": self.seconds,
+            "intervalMs": round(self.interval * 1000, 3),
+            "samples": self.sample_count,
+            "stacks": len(self.samples),
+        }
 
-def fetch_rss_posts(rss_url: str) -> list[dict]:
-    try:
-        with httpx.Client(timeout=10) as client:
-            res = client.get(rss_url, follow_redirects=True)
-            res.raise_for_status()
-            feed = feedparser.parse(res.content)
-    except Exception:
-        return []
-    items = []
-    for entry in feed.entries[:5]:
-        title = strip_html(getattr(entry, "title", ""))
-        summary = strip_html(getattr(entry, "summary", ""))
-        raw = title if not summary else f"{title}. {summary}"
-        text = clamp_sentences(raw, max_sentences=2)
-        if DEBUG_RSS:
-            print("RAW:", raw)
-            print("CLAMPED:", text)
-        if text:
-            items.append({"text": text})
-    return items
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
 
 
-def preview_rss(rss_url: str) -> SourcePreviewDTO:
-    if not rss_url.startswith("http"):
-        raise HTTPException(status_code=400, detail="Invalid rssUrl")
-    feed = feedparser.parse(rss_url)
-    title = getattr(feed.feed, "title", None)
-    items = []
-    for entry in feed.entries[:5]:
-        title_raw = strip_html(getattr(entry, "title", ""))
-        summary_raw = strip_html(getattr(entry, "summary", ""))
-        raw = title_raw if not summary_raw else f"{title_raw}. {summary_raw}"
-        text = clamp_sentences(raw, max_sentences=2)
-        if text:
-            items.append(text)
-    return SourcePreviewDTO(ok=bool(items), title=title, items=items)
+sampling_profiler = SamplingProfiler()
 
 
-def list_sources() -> list[dict]:
-    with get_db() as conn:
-        rows = conn.execute(
-            "SELECT id, handle, type, rss_url, enabled, last_sync_at FROM sources ORDER BY created_at DESC"
-        ).fetchall()
+def profile_summary(profiler: cProfile.Profile) -> list[dict]:
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
     return [
         {
-            "id": r["id"],
-            "handle": r["handle"],
-            "type": r["type"],
-            "rss_url": r["rss_url"],
-            "enabled": bool(r["enabled"]),
-            "lastSyncAt": r["last_sync_at"],
+            "function": f"{func} ({os.path.basename(filename)}:{line})",
+            "calls": calls,
+            "totalMs": round(total * 1000, 3),
+            "cumulativeMs": round(cumulative * 1000, 3),
         }
-        for r in rows
+        for (filename, line, func), (_, calls, total, cumulative, _) in rows
     ]
 
 
+def call_profiled(request: Request, enabled: bool, fn, *args, **kwargs) -> dict:
+    if not enabled:
+        return fn(*args, **kwargs)
+    require_admin(request)
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args, **kwargs)
+    return {**result, "profile": profile_summary(profiler)}
+
+
 # ------------------------
 # Routes
 # ------------------------
 
 @app.get("/sentences", response_model=List[SentenceDTO])
-def get_sentences():
-    with get_db() as conn:
-        rows = conn.execute(
-            "SELECT id, text_de, text_ja, tags_json FROM sentences ORDER BY created_at DESC LIMIT 50"
-        ).fetchall()
-        missing_ids = [
-            row["id"]
-            for row in rows
-            if row["text_ja"] in ("(未翻訳)", "(自動生成予定)")
-        ]
-        if missing_ids and USE_LLM:
-            for row in rows:
-                if row["id"] in missing_ids:
-                    translated = translate_ollama(row["text_de"])
-                    conn.execute(
-                        "UPDATE sentences SET text_ja = ? WHERE id = ?",
-                        (translated, row["id"]),
-                    )
-            conn.commit()
+@run_in("read")
+def get_sentences(request: Request, order: str = "recent", level: Optional[str] = None):
+    if order not in ("recent", "recommended"):
+        raise HTTPException(status_code=400, detail="order must be recent or recommended")
+    level_value = parse_level(level)
+    if order == "recommended":
+        rows = fetch_recommended(current_user(request), level_value)
+    else:
+        with get_db() as conn:
             rows = conn.execute(
                 "SELECT id, text_de, text_ja, tags_json FROM sentences ORDER BY created_at DESC LIMIT 50"
             ).fetchall()
-    if rows:
+    if USE_LLM:
+        request_enrichment([row["id"] for row in rows if row["text_ja"] in ("(未翻訳)", "(自動生成予定)")])
+    if rows or order == "recommended":
         return [
             SentenceDTO(
                 id=row["id"],
@@ -745,23 +4110,24 @@ def get_sentences():
 
 
 @app.get("/sentences/{sentence_id}", response_model=SentenceDetailDTO)
+@run_in("read")
 def get_sentence_detail(sentence_id: str):
     with get_db() as conn:
         row = conn.execute(
             "SELECT id, text_de, text_ja, tags_json FROM sentences WHERE id = ?",
             (sentence_id,),
         ).fetchone()
-        if row and row["text_ja"] in ("(未翻訳)", "(自動生成予定)") and USE_LLM:
-            translated = translate_ollama(row["text_de"])
-            conn.execute(
-                "UPDATE sentences SET text_ja = ? WHERE id = ?",
-                (translated, row["id"]),
-            )
-            conn.commit()
-            row = conn.execute(
-                "SELECT id, text_de, text_ja, tags_json FROM sentences WHERE id = ?",
-                (sentence_id,),
-            ).fetchone()
+        lex_rows = []
+        if row:
+            lex_rows = conn.execute(
+                """
+                SELECT id, text_de, meaning_ja, gender, etymology, preposition_pattern, verb_forms
+                FROM lexemes WHERE sentence_id = ?
+                """,
+                (row["id"],),
+            ).fetchall()
+    if row and row["text_ja"] in ("(未翻訳)", "(自動生成予定)") and USE_LLM:
+        request_enrichment([row["id"]])
     if row:
         try:
             tags = json.loads(row["tags_json"])
@@ -773,17 +4139,6 @@ def get_sentence_detail(sentence_id: str):
             textJa=row["text_ja"],
             tags=tags,
         )
-        try:
-            with get_db() as conn:
-                lex_rows = conn.execute(
-                    """
-                    SELECT id, text_de, meaning_ja, gender, etymology, preposition_pattern, verb_forms
-                    FROM lexemes WHERE sentence_id = ?
-                    """,
-                    (row["id"],),
-                ).fetchall()
-        except Exception:
-            lex_rows = []
         lexemes = [
             LexemeDTO(
                 id=r["id"],
@@ -811,6 +4166,7 @@ def get_sentence_detail(sentence_id: str):
 
 
 @app.get("/sources", response_model=List[SourceDTO])
+@run_in("read")
 def get_sources():
     return [
         SourceDTO(
@@ -826,6 +4182,7 @@ def get_sources():
 
 
 @app.patch("/sources/{source_id}", response_model=SourceDTO)
+@run_in("write")
 def update_source(source_id: str, body: UpdateSourceRequest):
     with get_db() as conn:
         row = conn.execute("SELECT id FROM sources WHERE id = ?", (source_id,)).fetchone()
@@ -865,6 +4222,7 @@ def update_source(source_id: str, body: UpdateSourceRequest):
 
 
 @app.post("/sources", response_model=SourceDTO)
+@run_in("write")
 def create_source(body: CreateSourceRequest):
     if body.type != "rss":
         raise HTTPException(status_code=400, detail="Only rss sources are supported")
@@ -893,6 +4251,7 @@ def create_source(body: CreateSourceRequest):
 
 
 @app.delete("/sources/{source_id}")
+@run_in("write")
 def delete_source(source_id: str):
     with get_db() as conn:
         row = conn.execute("SELECT id FROM sources WHERE id = ?", (source_id,)).fetchone()
@@ -904,31 +4263,125 @@ def delete_source(source_id: str):
 
 
 @app.post("/sources/preview", response_model=SourcePreviewDTO)
-def source_preview(body: CreateSourceRequest):
+async def source_preview(body: CreateSourceRequest):
     if body.type != "rss":
         raise HTTPException(status_code=400, detail="Only rss sources are supported")
-    return preview_rss(body.rssUrl.strip())
+    return await preview_rss(body.rssUrl.strip())
 
 
 @app.get("/cards", response_model=List[CardDTO])
-def get_cards(status: Optional[str] = None):
+@run_in("read")
+def get_cards(request: Request, status: Optional[str] = None):
+    user_id = current_user(request)
     try:
-        items = fetch_cards(status)
+        items = fetch_cards(user_id, status)
         return [CardDTO(**c) for c in items]
     except Exception:
         return []
 
 
+@app.get("/cards/stats", response_model=CardStatsDTO)
+@run_in("read")
+def get_card_stats(request: Request):
+    return CardStatsDTO(**fetch_card_stats(current_user(request)))
+
+
+@app.get("/reviews", response_model=List[ReviewLogDTO])
+@run_in("read")
+def get_review_log(request: Request, limit: int = 100):
+    limit = max(1, min(limit, 1000))
+    return [ReviewLogDTO(**item) for item in fetch_review_log(current_user(request), limit)]
+
+
+@app.post("/admin/users", response_model=CreatedUserDTO, dependencies=[Depends(require_admin_token)])
+@run_in("write")
+def admin_create_user(body: CreateUserRequest):
+    return CreatedUserDTO(**create_user(body.name))
+
+
+@app.get("/users/me", response_model=UserDTO)
+@run_in("read")
+def get_current_user(request: Request):
+    user_id = current_user(request)
+    with get_db() as conn:
+        row = conn.execute("SELECT id, name, created_at FROM users WHERE id = ?", (user_id,)).fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
+    return UserDTO(id=row["id"], name=row["name"], createdAt=row["created_at"])
+
+
+@app.get("/sentences/{sentence_id}/similar", response_model=List[SimilarSentenceDTO])
+async def get_similar_sentences(sentence_id: str, k: int = 10):
+    k = max(1, min(k, 100))
+    vector = await db_executor.run("read", embedding_index.vector_for, sentence_id)
+    if vector is None:
+        text_de = await db_executor.run("read", fetch_text_de, "sentences", sentence_id)
+        if text_de is None:
+            raise HTTPException(status_code=404, detail="Sentence not found")
+        llm_priority.set("interactive")
+        if not await db_executor.run("job", index_sentence_embeddings, [(sentence_id, text_de)]):
+            return []
+        vector = await db_executor.run("read", embedding_index.vector_for, sentence_id)
+        if vector is None:
+            return []
+    items = await db_executor.run("read", similar_sentences, vector, k, exclude=sentence_id)
+    return [SimilarSentenceDTO(**item) for item in items]
+
+
+@app.get("/lexemes/{lexeme_id}/similar", response_model=List[SimilarSentenceDTO])
+async def get_lexeme_similar_sentences(lexeme_id: str, k: int = 10):
+    import numpy as np
+
+    k = max(1, min(k, 100))
+    text_de = await db_executor.run("read", fetch_text_de, "lexemes", lexeme_id)
+    if text_de is None:
+        raise HTTPException(status_code=404, detail="Lexeme not found")
+    if not (EMBEDDINGS_ENABLED and USE_LLM):
+        return []
+    llm_priority.set("interactive")
+    try:
+        vector = np.frombuffer((await db_executor.run("job", embed_texts, [text_de]))[0], dtype=np.float32)
+    except Exception:
+        return []
+    items = await db_executor.run("read", similar_sentences, vector, k)
+    return [SimilarSentenceDTO(**item) for item in items]
+
+
+@app.get("/review/session", response_model=ReviewSessionDTO)
+@run_in("read")
+def get_review_session(request: Request, limit: int = 20):
+    limit = max(1, min(limit, 100))
+    user_id = current_user(request)
+    return ReviewSessionDTO(
+        generatedAt=iso(datetime.now(timezone.utc)),
+        items=[ReviewItemDTO(**item) for item in fetch_review_session(user_id, limit)],
+    )
+
+
 @app.post("/cards/{card_id}/review", response_model=CardDTO)
-def review_card(card_id: str, body: ReviewCardRequest):
+@run_in("write")
+def review_card(card_id: str, body: ReviewCardRequest, request: Request):
+    user_id = current_user(request)
     with get_db() as conn:
-        row = conn.execute("SELECT id FROM cards WHERE id = ?", (card_id,)).fetchone()
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT id, status, due_at FROM cards WHERE id = ? AND user_id = ?", (card_id, user_id)
+        ).fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Card not found")
         conn.execute(
             "UPDATE cards SET status = ? WHERE id = ?",
             (body.rating, card_id),
         )
+        conn.execute(
+            """
+            INSERT INTO card_reviews (user_id, card_id, rating, previous_status, reviewed_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (user_id, card_id, body.rating, row["status"], iso(datetime.now(timezone.utc))),
+        )
+        apply_card_stats(conn, user_id, row["status"], row["due_at"], -1)
+        apply_card_stats(conn, user_id, body.rating, row["due_at"], 1)
         conn.commit()
         updated = conn.execute(
             "SELECT id, front, back, status, due_at FROM cards WHERE id = ?",
@@ -944,7 +4397,9 @@ def review_card(card_id: str, body: ReviewCardRequest):
 
 
 @app.post("/cards", response_model=CardDTO)
-def create_card(body: CreateCardRequest):
+@run_in("write")
+def create_card(body: CreateCardRequest, request: Request):
+    user_id = current_user(request)
     with get_db() as conn:
         lex = conn.execute(
             """
@@ -956,8 +4411,8 @@ def create_card(body: CreateCardRequest):
         if not lex:
             raise HTTPException(status_code=404, detail="Lexeme not found")
         existing = conn.execute(
-            "SELECT id, front, back, status, due_at FROM cards WHERE lexeme_id = ?",
-            (body.lexemeId,),
+            "SELECT id, front, back, status, due_at FROM cards WHERE user_id = ? AND lexeme_id = ?",
+            (user_id, body.lexemeId),
         ).fetchone()
         if existing:
             return CardDTO(
@@ -981,11 +4436,12 @@ def create_card(body: CreateCardRequest):
         new_id = str(uuid4())
         conn.execute(
             """
-            INSERT INTO cards (id, lexeme_id, front, back, status, due_at, created_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO cards (id, lexeme_id, front, back, status, due_at, created_at, user_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (new_id, body.lexemeId, front, back, "new", None, iso(datetime.now(timezone.utc))),
+            (new_id, body.lexemeId, front, back, "new", None, iso(datetime.now(timezone.utc)), user_id),
         )
+        apply_card_stats(conn, user_id, "new", None, 1)
         conn.commit()
         created = conn.execute(
             "SELECT id, front, back, status, due_at FROM cards WHERE id = ?",
@@ -1001,38 +4457,285 @@ def create_card(body: CreateCardRequest):
 
 
 @app.get("/notifications/schedule", response_model=NotificationScheduleDTO)
+@run_in("read")
 def get_schedule():
-    return NotificationScheduleDTO(**schedule)
+    return NotificationScheduleDTO(**load_setting("schedule"))
 
 
 @app.patch("/notifications/schedule", response_model=NotificationScheduleDTO)
+@run_in("write")
 def update_schedule(body: NotificationScheduleDTO):
-    schedule.update(body.model_dump())
-    return NotificationScheduleDTO(**schedule)
+    save_setting("schedule", body.model_dump())
+    plan_notifications()
+    return NotificationScheduleDTO(**load_setting("schedule"))
+
+
+@app.get("/notifications/next", response_model=Optional[NotificationSlotDTO])
+@run_in("read")
+def get_next_notification():
+    return next_notification()
+
+
+@app.get("/notifications/queue", response_model=List[NotificationSlotDTO])
+@run_in("read")
+def get_notification_queue(hours: int = NOTIFY_HORIZON_HOURS):
+    if hours <= 0:
+        raise HTTPException(status_code=400, detail="hours must be positive")
+    return notification_queue(hours)
+
+
+@app.post("/admin/notifications/plan", dependencies=[Depends(require_admin_token)])
+@run_in("write")
+def admin_plan_notifications():
+    return plan_notifications()
 
 
 @app.get("/settings/abbreviations", response_model=AbbreviationsDTO)
+@run_in("read")
 def get_abbreviations():
-    return AbbreviationsDTO(abbreviations=sorted(abbreviations_extra))
+    return AbbreviationsDTO(abbreviations=sorted(load_setting("abbreviations")))
 
 
 @app.put("/settings/abbreviations", response_model=AbbreviationsDTO)
+@run_in("write")
 def update_abbreviations(body: AbbreviationsDTO):
-    global abbreviations_extra
-    abbreviations_extra = [abbr.strip() for abbr in body.abbreviations if abbr.strip()]
-    return AbbreviationsDTO(abbreviations=sorted(abbreviations_extra))
+    save_setting("abbreviations", [abbr.strip() for abbr in body.abbreviations if abbr.strip()])
+    return AbbreviationsDTO(abbreviations=sorted(load_setting("abbreviations")))
+
+
+@app.get("/admin/llm/metrics")
+async def admin_llm_metrics():
+    return llm_scheduler.metrics()
+
+
+@app.get("/admin/admission/metrics")
+async def admin_admission_metrics():
+    return admission_controller.metrics()
+
+
+@app.get("/admin/db/metrics")
+async def admin_db_metrics():
+    return db_executor.metrics()
 
 
 @app.post("/admin/backfill-translations")
+@run_in("job")
 def admin_backfill_translations(limit: int = 20):
-    updated = backfill_translations(limit=limit)
-    return {"updated": updated}
+    llm_priority.set("backfill")
+    tm_stats = new_tm_stats()
+    updated = backfill_translations(limit=limit, tm_stats=tm_stats)
+    return {"updated": updated, "translationMemory": tm_stats_summary(tm_stats)}
+
+
+@app.post("/admin/rebuild-near-dup-index", dependencies=[Depends(require_admin_token)])
+@run_in("job")
+def admin_rebuild_near_dup_index():
+    with get_db() as conn:
+        conn.execute("DELETE FROM minhash_bands")
+        conn.execute("DELETE FROM sentence_minhash")
+        indexed = index_missing_minhashes(conn)
+        conn.commit()
+    return {"indexed": indexed}
+
+
+@app.get("/snapshot/latest")
+async def get_latest_snapshot():
+    snapshot = await db_executor.run("read", latest_snapshot)
+    if snapshot is None:
+        try:
+            snapshot = await db_executor.run("job", build_snapshot)
+        except (OSError, sqlite3.Error):
+            raise HTTPException(status_code=503, detail="Snapshot unavailable")
+    elif snapshot["stale"]:
+        refresh_snapshot_in_background()
+    return FileResponse(
+        snapshot["path"],
+        media_type="application/gzip",
+        filename=f"berlincoach-snapshot-{snapshot['version']}.sqlite.gz",
+        headers={
+            "X-Snapshot-Version": str(snapshot["version"]),
+            "X-Snapshot-SHA256": snapshot["sha256"],
+            "Cache-Control": "public, max-age=300",
+        },
+    )
+
+
+@app.get("/snapshot/cards", response_model=SnapshotCardsDTO)
+@run_in("read")
+def get_snapshot_cards(request: Request):
+    return SnapshotCardsDTO(**fetch_snapshot_cards(current_user(request)))
+
+
+@app.get("/sync/changes", response_model=SyncChangesDTO)
+@run_in("read")
+def get_sync_changes(request: Request, since: int = 0, limit: int = SYNC_PAGE_SIZE):
+    limit = max(1, min(limit, 5000))
+    return SyncChangesDTO(**fetch_sync_changes(current_user(request), since, limit))
+
+
+@app.post("/admin/snapshot", dependencies=[Depends(require_admin_token)])
+@run_in("job")
+def admin_build_snapshot():
+    snapshot = build_snapshot()
+    return {k: v for k, v in snapshot.items() if k != "path"}
+
+
+@app.get("/archive/sentences", response_model=List[SentenceDTO])
+@run_in("read")
+def get_archived_sentences(q: Optional[str] = None, source: Optional[str] = None, limit: int = 50):
+    limit = max(1, min(limit, 500))
+    return [SentenceDTO(**item) for item in search_archive(q, source, limit)]
+
+
+@app.get("/archive/sentences/{sentence_id}", response_model=SentenceDetailDTO)
+@run_in("read")
+def get_archived_sentence(sentence_id: str):
+    detail = fetch_archived_sentence(sentence_id)
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Sentence not found")
+    return SentenceDetailDTO(
+        sentence=SentenceDTO(**detail["sentence"]),
+        lexemes=[LexemeDTO(**lex) for lex in detail["lexemes"]],
+    )
+
+
+@app.get("/admin/retention/policies", response_model=List[RetentionPolicyDTO], dependencies=[Depends(require_admin_token)])
+@run_in("read")
+def get_retention_policies():
+    with get_db() as conn:
+        policies = retention_policies(conn)
+    return [RetentionPolicyDTO(sourceHandle=handle, **policy) for handle, policy in sorted(policies.items())]
+
+
+@app.put("/admin/retention/policies/{source_handle}", response_model=RetentionPolicyDTO, dependencies=[Depends(require_admin_token)])
+@run_in("write")
+def update_retention_policy(source_handle: str, body: RetentionPolicyDTO):
+    if (body.maxAgeDays is not None and body.maxAgeDays < 0) or (
+        body.maxSentences is not None and body.maxSentences < 0
+    ):
+        raise HTTPException(status_code=400, detail="Limits must be non-negative")
+    with get_db() as conn:
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO retention_policies (source_handle, max_age_days, max_sentences, updated_at)
+            VALUES (?, ?, ?, ?)
+            """,
+            (source_handle, body.maxAgeDays, body.maxSentences, iso(datetime.now(timezone.utc))),
+        )
+        conn.commit()
+    return RetentionPolicyDTO(sourceHandle=source_handle, maxAgeDays=body.maxAgeDays, maxSentences=body.maxSentences)
+
+
+@app.post("/admin/retention/run", dependencies=[Depends(require_admin_token)])
+@run_in("job")
+def admin_run_retention(dryRun: bool = False):
+    return run_retention(dry_run=dryRun)
+
+
+@app.post("/admin/backfill-embeddings", dependencies=[Depends(require_admin_token)])
+@run_in("job")
+def admin_backfill_embeddings(limit: int = 500):
+    llm_priority.set("backfill")
+    return {"indexed": backfill_embeddings(max(1, min(limit, 10000)))}
+
+
+@app.post("/admin/rescore", dependencies=[Depends(require_admin_token)])
+@run_in("job")
+def admin_rescore(limit: int = 10000, full: bool = False):
+    if full:
+        with get_db() as conn:
+            conn.execute("INSERT OR IGNORE INTO score_dirty (sentence_id) SELECT id FROM sentences")
+            conn.commit()
+    rescored = 0
+    while rescored < limit:
+        batch = rescore_dirty(min(SCORE_RESCORE_BATCH, limit - rescored))
+        if not batch:
+            break
+        rescored += batch
+    with get_db() as conn:
+        pending = conn.execute("SELECT COUNT(*) AS c FROM score_dirty").fetchone()["c"]
+    return {"rescored": rescored, "pending": pending}
+
+
+@app.post("/admin/rebuild-card-stats", dependencies=[Depends(require_admin_token)])
+@run_in("write")
+def admin_rebuild_card_stats():
+    with get_db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        statuses, days = compute_card_stats(conn)
+        stored_statuses = {
+            (r["user_id"], r["status"]): r["count"]
+            for r in conn.execute("SELECT user_id, status, count FROM card_status_counts WHERE count != 0")
+        }
+        stored_days = {
+            (r["user_id"], r["day"]): r["count"]
+            for r in conn.execute("SELECT user_id, day, count FROM card_due_days WHERE count != 0")
+        }
+        consistent = stored_statuses == statuses and stored_days == days
+        rebuild_card_stats(conn)
+        conn.commit()
+    return {"consistent": consistent, "cards": sum(statuses.values())}
+
+
+@app.post("/admin/replay-feeds", dependencies=[Depends(require_admin_token)])
+@run_in("job")
+def admin_replay_feeds(
+    request: Request,
+    source: Optional[str] = None,
+    since: Optional[str] = None,
+    limit: Optional[int] = None,
+    profile: bool = False,
+):
+    llm_priority.set("backfill")
+    return call_profiled(request, profile, replay_feed_archive, source_handle=source, since=since, limit=limit)
+
+
+@app.post("/admin/profile/start")
+@run_in("job")
+def admin_profile_start(request: Request, seconds: int = 30, intervalMs: float = 5):
+    require_admin(request)
+    seconds = max(1, min(seconds, PROFILE_MAX_SECONDS))
+    return sampling_profiler.start(seconds, max(1.0, intervalMs) / 1000)
+
+
+@app.post("/admin/profile/stop")
+@run_in("job")
+def admin_profile_stop(request: Request):
+    require_admin(request)
+    return sampling_profiler.stop()
+
+
+@app.get("/admin/profile/status")
+@run_in("read")
+def admin_profile_status(request: Request):
+    require_admin(request)
+    return sampling_profiler.status()
+
+
+@app.get("/admin/profile/collapsed", response_class=PlainTextResponse)
+@run_in("read")
+def admin_profile_collapsed(request: Request):
+    require_admin(request)
+    return PlainTextResponse(sampling_profiler.collapsed())
+
+
+@app.get("/admin/profile/slow-queries")
+@run_in("read")
+def admin_slow_queries(request: Request):
+    require_admin(request)
+    return {"thresholdMs": SLOW_QUERY_MS, "queries": list(slow_queries)}
+
+
+@app.post("/admin/prune-feed-archive", dependencies=[Depends(require_admin_token)])
+@run_in("job")
+def admin_prune_feed_archive():
+    return prune_feed_archive()
 
 
 @app.post("/admin/backfill-lexemes")
+@run_in("job")
 def admin_backfill_lexemes(limit: int = 20):
-    if not USE_LLM:
-        return {"updated": 0}
+    llm_priority.set("backfill")
     updated = 0
     with get_db() as conn:
         rows = conn.execute(
@@ -1076,64 +4779,164 @@ def admin_backfill_lexemes(limit: int = 20):
         ):
             targets.append(row)
     for row in targets:
-        lexemes = call_ollama(row["text_de"])
+        lexemes = extract_lexemes(row["text_de"])
         if lexemes:
             insert_lexemes(row["id"], lexemes)
             updated += 1
     return {"updated": updated}
 
 
+def ingest_single(text: str, source: str) -> dict:
+    tm_stats = new_tm_stats()
+    sentence_id, inserted = store_sentence(text, source, tm_stats)
+    return {
+        "stored": 1 if inserted else 0,
+        "sentenceId": sentence_id,
+        "translationMemory": tm_stats_summary(tm_stats),
+    }
+
+
 @app.post("/ingest")
-def ingest_text(body: IngestRequest):
+@run_in("job")
+def ingest_text(body: IngestRequest, request: Request, profile: bool = False):
+    llm_priority.set("interactive")
     text = body.text.strip()
     if not text:
         raise HTTPException(status_code=400, detail="Text is empty")
-    sentence_id, inserted = insert_sentence(
-        text_de=text,
-        text_ja=translate_ollama(text),
-        tags=[body.source or "manual"],
-        source_handle=body.source or "manual",
-    )
-    if inserted:
-        lexemes = call_ollama(text)
-        if lexemes:
-            insert_lexemes(sentence_id, lexemes)
-    return {"stored": 1 if inserted else 0, "sentenceId": sentence_id}
+    return call_profiled(request, profile, ingest_single, text, body.source or "manual")
+
+
+async def iter_ndjson_lines(request: Request) -> AsyncIterator[Optional[bytes]]:
+    buffer = bytearray()
+    overflow = False
+    async for chunk in request.stream():
+        start = 0
+        while True:
+            idx = chunk.find(b"\n", start)
+            if idx < 0:
+                break
+            if overflow or len(buffer) + idx - start > BULK_INGEST_MAX_LINE_BYTES:
+                overflow = False
+                yield None
+            else:
+                buffer += chunk[start:idx]
+                yield bytes(buffer)
+            buffer.clear()
+            start = idx + 1
+        if not overflow:
+            buffer += chunk[start:]
+            if len(buffer) > BULK_INGEST_MAX_LINE_BYTES:
+                overflow = True
+                buffer.clear()
+    if overflow:
+        yield None
+    elif buffer.strip():
+        yield bytes(buffer)
+
+
+def parse_bulk_line(raw: Optional[bytes]) -> tuple[Optional[dict], Optional[str]]:
+    if raw is None:
+        return None, "line too long"
+    try:
+        obj = json.loads(raw)
+    except ValueError:
+        return None, "invalid json"
+    if not isinstance(obj, dict) or not isinstance(obj.get("text"), str):
+        return None, "text is required"
+    text = obj["text"].strip()
+    if not text:
+        return None, "Text is empty"
+    source = obj.get("source")
+    return {"text": text, "source": source if isinstance(source, str) and source else "manual"}, None
+
+
+async def bulk_ingest_results(request: Request) -> AsyncIterator[bytes]:
+    pending: list[tuple[int, Optional[dict], Optional[str]]] = []
+    totals = {"lines": 0, "stored": 0, "duplicates": 0, "errors": 0}
+
+    async def flush() -> AsyncIterator[bytes]:
+        items = [item for _, item, _ in pending if item is not None]
+        outcomes = iter(await db_executor.run("job", insert_sentences_batch, items) if items else [])
+        if items:
+            ensure_enrichment_worker()
+        for line_no, item, error in pending:
+            if item is None:
+                totals["errors"] += 1
+                result = {"line": line_no, "status": "error", "detail": error}
+            else:
+                sentence_id, inserted = next(outcomes)
+                totals["stored" if inserted else "duplicates"] += 1
+                result = {
+                    "line": line_no,
+                    "status": "stored" if inserted else "duplicate",
+                    "sentenceId": sentence_id,
+                }
+            yield (json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8")
+        pending.clear()
+
+    async for raw in iter_ndjson_lines(request):
+        if raw is not None and not raw.strip():
+            continue
+        totals["lines"] += 1
+        item, error = parse_bulk_line(raw)
+        pending.append((totals["lines"], item, error))
+        if len(pending) >= BULK_INGEST_BATCH_SIZE:
+            async for out in flush():
+                yield out
+    if pending:
+        async for out in flush():
+            yield out
+    summary = dict(totals, queued=await db_executor.run("read", count_enrichment_jobs))
+    yield (json.dumps({"summary": summary}) + "\n").encode("utf-8")
+
+
+class BodyStreamingResponse(StreamingResponse):
+    # The body iterator reads the request stream itself, so skip the
+    # disconnect listener that would compete with it for receive().
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@app.post("/ingest/bulk")
+async def ingest_bulk(request: Request):
+    return BodyStreamingResponse(bulk_ingest_results(request), media_type="application/x-ndjson")
 
 
 @app.post("/ingest/auto")
-def ingest_auto():
+@run_in("job")
+def ingest_auto(request: Request, profile: bool = False):
+    llm_priority.set("feed")
+    return call_profiled(request, profile, run_auto_ingest)
+
+
+def run_auto_ingest() -> dict:
     enabled_sources = [s for s in list_sources() if s["enabled"]]
     fetched = 0
     stored = 0
     errors: list[str] = []
+    tm_stats = new_tm_stats()
 
     for src in enabled_sources:
         last_sync_at = "今"
+        newest_id = None
         try:
             if src.get("type") == "rss":
-                posts = fetch_rss_posts(src["rss_url"])
+                posts = fetch_rss_posts(src["rss_url"], src.get("handle"))
             else:
-                handle = src["handle"]
-                user_id = fetch_user_id(handle)
-                posts = fetch_user_posts(user_id)
+                posts, newest_id = fetch_x_source_posts(src)
             fetched += len(posts)
 
             for post in posts:
                 text = post.get("text", "").strip()
                 if not text:
                     continue
-                sentence_id, inserted = insert_sentence(
-                    text_de=text,
-                    text_ja=translate_ollama(text),
-                    tags=[src.get("handle", "rss")],
-                    source_handle=src.get("handle", "rss"),
-                )
+                _, inserted = store_sentence(text, src.get("handle", "rss"), tm_stats)
                 if inserted:
-                    lexemes = call_ollama(text)
-                    if lexemes:
-                        insert_lexemes(sentence_id, lexemes)
                     stored += 1
+            if newest_id:
+                save_x_since_id(src["id"], newest_id)
         except Exception:
             last_sync_at = "失敗"
             errors.append(src.get("handle", "rss"))
@@ -1145,4 +4948,12 @@ def ingest_auto():
             )
             conn.commit()
 
-    return {"fetched": fetched, "stored": stored, "errors": errors}
+    if FEED_ARCHIVE_ENABLED:
+        prune_feed_archive()
+
+    return {
+        "fetched": fetched,
+        "stored": stored,
+        "errors": errors,
+        "translationMemory": tm_stats_summary(tm_stats),
+    }